@@ -0,0 +1 @@
+"""Benchmarks of dynamic_sitemap hot paths. Not a part of the package."""
@@ -0,0 +1,86 @@
+"""ORM fetchers against plain queries on a wide SQLite table.
+
+Compares loading whole model objects (helpers.get_query, used before)
+with projected streaming fetchers (helpers.get_fetcher).
+Measured with SQLAlchemy which should be installed.
+
+Usage:
+    python -m benchmarks.fetchers [--rows 100000] [--columns 20]
+"""
+import argparse
+import tracemalloc
+from datetime import datetime
+from time import perf_counter
+
+from dynamic_sitemap.helpers import get_fetcher, get_query
+
+
+FIELDS = ['slug', 'updated']
+
+
+def measure(name: str, consume):
+    tracemalloc.start()
+    started = perf_counter()
+    count = consume()
+    elapsed = perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f'{name:<28} {count:>9} rows  {elapsed:8.3f} s  peak {peak / 1024 / 1024:8.1f} MiB')
+
+
+def bench_sqlalchemy(rows: int, columns: int):
+    import sqlalchemy
+    from sqlalchemy.orm import declarative_base, scoped_session, sessionmaker
+
+    engine = sqlalchemy.create_engine('sqlite://')
+    session = scoped_session(sessionmaker(bind=engine))
+    attrs = {
+        '__tablename__': 'post',
+        'query': session.query_property(),
+        'id': sqlalchemy.Column(sqlalchemy.Integer, primary_key=True),
+        'slug': sqlalchemy.Column(sqlalchemy.String),
+        'updated': sqlalchemy.Column(sqlalchemy.DateTime),
+    }
+    attrs.update({f'text{i}': sqlalchemy.Column(sqlalchemy.Text) for i in range(columns)})
+    post = type('Post', (declarative_base(),), attrs)
+    post.metadata.create_all(engine)
+
+    text = 'x' * 200
+    session.execute(
+        post.__table__.insert(),
+        [
+            {'slug': f'slug-{i}', 'updated': datetime(2020, 1, 1), **{f'text{c}': text for c in range(columns)}}
+            for i in range(rows)
+        ],
+    )
+    session.commit()
+
+    def objects():
+        query = get_query('sqlalchemy')
+        return sum(1 for record in query(post) if (record.slug, record.updated))
+
+    def projected():
+        fetch = get_fetcher('sqlalchemy')
+        return sum(1 for _ in fetch(post, FIELDS))
+
+    print(f'SQLAlchemy, {columns} extra text columns:')
+    measure('query.all()', objects)
+    session.remove()
+    measure('with_entities().yield_per()', projected)
+    session.remove()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--columns', type=int, default=20)
+    args = parser.parse_args()
+
+    try:
+        bench_sqlalchemy(args.rows, args.columns)
+    except ImportError:
+        print('SQLAlchemy is not installed')
+
+
+if __name__ == '__main__':
+    main()
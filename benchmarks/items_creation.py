@@ -0,0 +1,40 @@
+"""Throughput of sitemap items creation.
+
+Compares creating items one by one with SitemapItem.bulk.
+
+Usage:
+    python -m benchmarks.items_creation [--count 200000]
+"""
+import argparse
+from time import perf_counter
+
+from dynamic_sitemap.items import SitemapItem
+
+
+def measure(name: str, function, *args, **kwargs):
+    started = perf_counter()
+    result = function(*args, **kwargs)
+    elapsed = perf_counter() - started
+    print(f'{name:<24} {elapsed:8.3f} s  {len(result) / elapsed:12,.0f} items/s')
+    return result
+
+
+def create_one_by_one(rows, changefreq, priority):
+    return [SitemapItem(loc, lastmod, changefreq, priority) for loc, lastmod in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--count', type=int, default=200_000)
+    args = parser.parse_args()
+
+    rows = [(f'https://example.com/page/{i}/', '2020-01-01T10:00:00+03:00') for i in range(args.count)]
+    print(f'{args.count} items:')
+
+    measure('one by one', create_one_by_one, rows, 'daily', 0.5)
+    measure('bulk', SitemapItem.bulk, rows, 'daily', 0.5)
+    measure('bulk, trusted lastmod', SitemapItem.bulk, rows, 'daily', 0.5, check_lastmod=False)
+
+
+if __name__ == '__main__':
+    main()
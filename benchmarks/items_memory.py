@@ -0,0 +1,81 @@
+"""Memory footprint of sitemap items.
+
+Shows bytes allocated per SitemapItem and the process RSS across repeated
+rebuilds of a dynamic sitemap, which should stay flat.
+
+Usage:
+    python -m benchmarks.items_memory [--count 1000000] [--rebuilds 5]
+"""
+import argparse
+import gc
+import resource
+import sys
+import tracemalloc
+from datetime import datetime
+
+from dynamic_sitemap.core import DynamicSitemapBase
+from dynamic_sitemap.helpers import Model
+from dynamic_sitemap.items import SitemapItem
+
+
+BASE_URL = 'https://site.com'
+
+
+class BenchSitemap(DynamicSitemapBase):
+
+    def view(self, *args, **kwargs):
+        """Not used in benchmarks."""
+
+
+def get_rss() -> int:
+    """Get the current resident set size in bytes."""
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        # ru_maxrss is a peak value in kilobytes on Linux and in bytes on macOS
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss if sys.platform == 'darwin' else rss * 1024
+
+
+def measure_items(count: int):
+    locs = [f'{BASE_URL}/page/{i}' for i in range(count)]
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    items = [SitemapItem(loc, '2020-01-01', 'daily', 0.5) for loc in locs]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    # the list of items is included, 8 bytes per pointer
+    print(f'Items: {count}')
+    print(f'Allocated: {allocated / 1024 / 1024:.1f} MiB, {allocated / count:.1f} bytes per item')
+    print(f'Object size: {sys.getsizeof(items[0])} bytes')
+
+
+def measure_rebuilds(count: int, rebuilds: int):
+    rows = [(f'slug-{i}', datetime(2020, 1, 1)) for i in range(count)]
+    sitemap = BenchSitemap(BASE_URL)
+    sitemap._rules = ['/page/<slug>']
+    sitemap.add_rule('/page', Model(lambda: rows), loc_from='slug', lastmod_from='lastmod')
+
+    for number in range(1, rebuilds + 1):
+        sitemap.items = set()
+        sitemap._get_items()
+        gc.collect()
+        print(f'Rebuild {number}: {len(sitemap.items)} items, RSS {get_rss() / 1024 / 1024:.1f} MiB')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--count', type=int, default=1_000_000)
+    parser.add_argument('--rebuilds', type=int, default=5)
+    args = parser.parse_args()
+
+    measure_items(args.count)
+    measure_rebuilds(args.count // 10, args.rebuilds)
+
+
+if __name__ == '__main__':
+    main()
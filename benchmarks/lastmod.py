@@ -0,0 +1,47 @@
+"""Throughput of lastmod formatting.
+
+Compares the previous way (pytz lookup, astimezone, isoformat and regex
+validation per value) with helpers.DatetimeFormatter on a batch.
+
+Usage:
+    python -m benchmarks.lastmod [--count 1000000] [--timezone Europe/Moscow]
+"""
+import argparse
+from datetime import datetime, timedelta
+from time import perf_counter
+
+from pytz import timezone
+
+from dynamic_sitemap.helpers import DatetimeFormatter
+from dynamic_sitemap.validators import LastModified
+
+
+def format_previously(values, tz):
+    return [LastModified.validate(dt.astimezone(timezone(tz)).isoformat(timespec='seconds')) for dt in values]
+
+
+def measure(name: str, function, *args):
+    started = perf_counter()
+    result = function(*args)
+    elapsed = perf_counter() - started
+    print(f'{name:<24} {elapsed:8.3f} s  {len(result) / elapsed:12,.0f} values/s')
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--count', type=int, default=1_000_000)
+    parser.add_argument('--timezone', default='Europe/Moscow')
+    args = parser.parse_args()
+
+    start = datetime(2015, 1, 1)
+    values = [start + timedelta(seconds=i * 97) for i in range(args.count)]
+    print(f'{args.count} datetimes, {args.timezone}:')
+
+    previous = measure('pytz + validation', format_previously, values, args.timezone)
+    current = measure('DatetimeFormatter', DatetimeFormatter(args.timezone).format_many, values)
+    assert previous == current
+
+
+if __name__ == '__main__':
+    main()
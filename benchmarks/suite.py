@@ -0,0 +1,196 @@
+"""Time and peak memory of the hot paths on synthetic sitemaps.
+
+Every stage is timed as the best of several runs and then run once more
+under tracemalloc to get its peak memory. Imports of the package are timed
+by ``python -X importtime`` in new interpreters. Results are saved to JSON and,
+if a baseline is given, compared with it: the exit code is 1 if a stage
+became slower or bigger than the threshold allows.
+
+Usage:
+    python -m benchmarks.suite [--sizes 10000 100000 1000000] [--output results.json]
+                               [--baseline baseline.json] [--threshold 0.2]
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+from datetime import datetime, timedelta
+from time import perf_counter
+from typing import Callable, Dict, List, Tuple
+
+from dynamic_sitemap.helpers import get_items, get_iso_datetime, join_url_path
+from dynamic_sitemap.items import SitemapItem
+from dynamic_sitemap.renderers import SitemapXMLRenderer
+from dynamic_sitemap.validators import ChangeFrequency, LastModified, Location, Priority
+
+
+BASE_URL = 'https://site.com'
+Stage = Tuple[str, Callable[[], object]]
+IMPORTS = {
+    'package': 'import dynamic_sitemap',
+    'SimpleSitemap': 'from dynamic_sitemap import SimpleSitemap',
+    'FlaskSitemap': 'from dynamic_sitemap import FlaskSitemap',
+}
+
+
+def generate_paths(count: int) -> List[str]:
+    return [f'/section-{i % 100}/page-{i}/' for i in range(count)]
+
+
+def generate_datetimes(count: int) -> List[datetime]:
+    start = datetime(2015, 1, 1)
+    return [start + timedelta(minutes=i) for i in range(count)]
+
+
+def get_stages(count: int, directory: str) -> List[Stage]:
+    """Prepare the input data of a size and get the stages to measure."""
+    paths = generate_paths(count)
+    locs = [BASE_URL + path for path in paths]
+    datetimes = generate_datetimes(count)
+    lastmods = [dt.isoformat(timespec='seconds') for dt in datetimes]
+    raw = [{'loc': path, 'lastmod': lastmod, 'priority': 0.5} for path, lastmod in zip(paths, lastmods)]
+    items = [SitemapItem(loc, lastmod, 'daily', 0.5) for loc, lastmod in zip(locs, lastmods)]
+    filename = os.path.join(directory, 'sitemap.xml')
+
+    def validate():
+        for loc, lastmod in zip(locs, lastmods):
+            Location.validate(loc)
+            LastModified.validate(lastmod)
+            ChangeFrequency.validate('daily')
+            Priority.validate(0.5)
+
+    return [
+        ('SitemapItem', lambda: [SitemapItem(loc, lastmod, 'daily', 0.5) for loc, lastmod in zip(locs, lastmods)]),
+        ('validators', validate),
+        ('get_items', lambda: get_items(raw, SitemapItem, BASE_URL, 'daily', 0.5)),
+        ('join_url_path', lambda: [join_url_path(BASE_URL, '/section/', path, '/') for path in paths]),
+        ('get_iso_datetime', lambda: [get_iso_datetime(dt, 'Europe/Moscow') for dt in datetimes]),
+        ('render', lambda: SitemapXMLRenderer(items).render()),
+        ('write', lambda: SitemapXMLRenderer(items).write(filename)),
+    ]
+
+
+def measure(function: Callable[[], object], repeat: int) -> Dict[str, float]:
+    """Get the best time of runs and the peak memory of a run."""
+    seconds = float('inf')
+
+    for _ in range(repeat):
+        started = perf_counter()
+        function()
+        seconds = min(seconds, perf_counter() - started)
+
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {'seconds': seconds, 'peak_bytes': peak}
+
+
+def measure_import(statement: str, repeat: int) -> Dict[str, float]:
+    """Get the best time of imports made by a statement in a new interpreter."""
+    code = f'import sys; sys.stderr.write("-- start\\n"); {statement}'
+    seconds = float('inf')
+
+    for _ in range(repeat):
+        process = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', code],
+            stderr=subprocess.PIPE, universal_newlines=True, check=True,
+        )
+        lines = process.stderr.split('-- start\n', 1)[-1].splitlines()
+        # cumulative microseconds of imports made by the statement itself, nested ones are included
+        fields = [line.split('|') for line in lines if line.startswith('import time:')]
+        total = sum(int(field[1]) for field in fields if not field[2].startswith('  '))
+        seconds = min(seconds, total / 1_000_000)
+
+    return {'seconds': seconds}
+
+
+def run(sizes: List[int], repeat: int) -> Dict[str, Dict[str, Dict[str, float]]]:
+    results = {}
+    results['import'] = import_results = {}
+
+    for name, statement in IMPORTS.items():
+        import_results[name] = result = measure_import(statement, repeat)
+        print(f'{"import":>9} {name:<18} {result["seconds"]:9.4f} s')
+
+    with tempfile.TemporaryDirectory() as directory:
+        for count in sizes:
+            results[str(count)] = size_results = {}
+
+            for name, function in get_stages(count, directory):
+                size_results[name] = result = measure(function, repeat)
+                print(
+                    f'{count:>9} {name:<18} {result["seconds"]:9.4f} s '
+                    f'{result["peak_bytes"] / 1024 / 1024:10.1f} MiB',
+                )
+
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> List[str]:
+    """Get descriptions of stages exceeding the baseline more than the threshold."""
+    regressions = []
+
+    for count, stages in results.items():
+        for name, result in stages.items():
+            expected = baseline.get(count, {}).get(name)
+            if not expected:
+                continue
+
+            for metric, value in result.items():
+                if expected.get(metric) and value > expected[metric] * (1 + threshold):
+                    regressions.append(
+                        f'{count} {name} {metric}: {value:.4g} against {expected[metric]:.4g} '
+                        f'(+{value / expected[metric] - 1:.0%})',
+                    )
+
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--repeat', type=int, default=3, help='runs to take the best time of')
+    parser.add_argument('--output', help='a file to save results to')
+    parser.add_argument('--baseline', help='a file with results to compare with')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed excess over the baseline, 0.2 is 20%%')
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.repeat)
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'results': results,
+            }, file, indent=2)
+        print(f'Results are saved to {args.output}')
+
+    if not args.baseline:
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f'Baseline {args.baseline} is not found, nothing to compare with')
+        return 0
+
+    with open(args.baseline) as file:
+        regressions = compare(results, json.load(file)['results'], args.threshold)
+
+    for regression in regressions:
+        print('Regression:', regression)
+
+    if not regressions:
+        print(f'No regressions over {args.threshold:.0%} against {args.baseline}')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -36,16 +36,24 @@ Also you can set configurations from your class:
     sitemap.add_rule('/goods', Product, loc_from='id', lastmod_from='updated')
     sitemap.write()
 """
-from datetime import date
+import sys
+from importlib import import_module
 
-from .config import SitemapConfig
-from .contrib.flask import FlaskSitemap
-from .core import SimpleSitemap, SimpleSitemapIndex
-from .helpers import Model
-from .validators import ChangeFreq
 
-
-_YEAR = date.today().year
+__all__ = [
+    'ChangeFreq', 'DjangoSitemap', 'FlaskSitemap', 'Model', 'SimpleSitemap', 'SimpleSitemapIndex', 'SitemapConfig',
+]
+# modules of the public names are imported on the first access,
+# so integrations and their frameworks are not imported until they are used
+_LAZY = {
+    'ChangeFreq': '.validators',
+    'DjangoSitemap': '.contrib.django',
+    'FlaskSitemap': '.contrib.flask',
+    'Model': '.helpers',
+    'SimpleSitemap': '.core',
+    'SimpleSitemapIndex': '.core',
+    'SitemapConfig': '.config',
+}
 
 __author__ = 'Denis Kazakov'
 __about__ = {
@@ -56,5 +64,24 @@ __about__ = {
     'author': __author__,
     'email': 'denis@kazakov.ru.net',
     'license': 'MIT',
-    'copyright': f'Copyright 2020-{_YEAR} {__author__}',
+    'copyright': f'Copyright 2020-present {__author__}',
 }
+
+
+def __getattr__(name: str):
+    if name not in _LAZY:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+    value = getattr(import_module(_LAZY[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
+
+
+if sys.version_info < (3, 7):    # pragma: no cover
+    # module __getattr__ is not supported
+    for _name in _LAZY:
+        __getattr__(_name)
@@ -0,0 +1,253 @@
+"""Caches to share prepared sitemap data between processes and restarts.
+
+Example:
+
+    from dynamic_sitemap import FlaskSitemap
+    from dynamic_sitemap.cache import SQLiteCache
+
+    sitemap = FlaskSitemap(app, 'https://mysite.com', cache=SQLiteCache('/tmp/sitemap.db', ttl=3600))
+
+A sitemap uses values built within its config.CACHE_PERIOD only, a TTL just bounds how long they are stored.
+"""
+import hashlib
+import os
+import sqlite3
+import struct
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Iterator, Optional, Tuple  # noqa: F401
+
+from .exceptions import SitemapValidationError
+from .renderers import AtomicFile
+
+
+class CacheBase(ABC):
+    """The base class for caches storing bytes by string keys.
+
+    :param ttl: seconds to keep a value for; if None, values are kept until evicted
+    :param max_size: bytes; if set, least recently used values are evicted to fit into it
+    """
+
+    def __init__(self, ttl: Optional[float] = None, max_size: Optional[int] = None):
+        if ttl is not None and not (isinstance(ttl, (int, float)) and ttl > 0):
+            raise SitemapValidationError('TTL should be a float greater than 0.0')
+        if max_size is not None and not (isinstance(max_size, int) and max_size > 0):
+            raise SitemapValidationError('Max size should be an integer greater than 0')
+        self.ttl = ttl
+        self.max_size = max_size
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        """Get a value if it is not expired."""
+
+    @abstractmethod
+    def set(self, key: str, value: bytes):
+        """Store a value evicting least recently used ones if needed."""
+
+    @abstractmethod
+    def delete(self, key: str):
+        """Remove a value."""
+
+    @abstractmethod
+    def clear(self):
+        """Remove all values."""
+
+    def _get_expires(self) -> float:
+        return time.time() + self.ttl if self.ttl else float('inf')
+
+
+class MemoryCache(CacheBase):
+    """A cache of a process."""
+
+    def __init__(self, ttl: Optional[float] = None, max_size: Optional[int] = None):
+        super().__init__(ttl, max_size)
+        self._values = OrderedDict()    # type: OrderedDict[str, Tuple[float, bytes]]
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            if key not in self._values:
+                return None
+
+            expires, value = self._values[key]
+            if expires <= time.time():
+                self._remove(key)
+                return None
+
+            self._values.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes):
+        with self._lock:
+            if key in self._values:
+                self._remove(key)
+
+            self._values[key] = self._get_expires(), value
+            self._size += len(value)
+
+            while self.max_size and self._size > self.max_size:
+                self._remove(next(iter(self._values)))
+
+    def delete(self, key: str):
+        with self._lock:
+            if key in self._values:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+            self._size = 0
+
+    def _remove(self, key: str):
+        _, value = self._values.pop(key)
+        self._size -= len(value)
+
+
+class FileSystemCache(CacheBase):
+    """A cache keeping values in files of a directory, so it is shared by processes of a host.
+    A file is named after a hash of a key and starts with its expiration time,
+    its modification time is updated on reading to evict least recently used files.
+
+    :param directory: a path to a directory, it is created if needed
+    """
+    _header = struct.Struct('!d')
+
+    def __init__(self, directory: str, ttl: Optional[float] = None, max_size: Optional[int] = None):
+        super().__init__(ttl, max_size)
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def get(self, key: str) -> Optional[bytes]:
+        filename = self._get_filename(key)
+        try:
+            with open(filename, 'rb') as file:
+                data = file.read()
+        except FileNotFoundError:
+            return None
+
+        expires, = self._header.unpack_from(data)
+        if expires <= time.time():
+            self._remove(filename)
+            return None
+
+        try:
+            os.utime(filename)
+        except FileNotFoundError:
+            pass
+        return data[self._header.size:]
+
+    def set(self, key: str, value: bytes):
+        with AtomicFile(self._get_filename(key)) as file:
+            file.write(self._header.pack(self._get_expires()))
+            file.write(value)
+
+        if self.max_size:
+            self._evict()
+
+    def delete(self, key: str):
+        self._remove(self._get_filename(key))
+
+    def clear(self):
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.cache'):
+                self._remove(entry.path)
+
+    def _get_filename(self, key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha1(key.encode()).hexdigest() + '.cache')
+
+    def _evict(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.cache'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size - self._header.size, entry.path))
+
+        size = sum(entry[1] for entry in entries)
+        for _, file_size, filename in sorted(entries):
+            if size <= self.max_size:    # type: ignore
+                break
+            self._remove(filename)
+            size -= file_size
+
+    @staticmethod
+    def _remove(filename: str):
+        try:
+            os.remove(filename)
+        except FileNotFoundError:
+            pass
+
+
+class SQLiteCache(CacheBase):
+    """A cache keeping values in an SQLite database, so it is shared by processes of a host.
+
+    :param filename: a path to a database file, it is created if needed
+    """
+
+    def __init__(self, filename: str, ttl: Optional[float] = None, max_size: Optional[int] = None):
+        super().__init__(ttl, max_size)
+        self.filename = filename
+        with self._connect() as connection:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS sitemap_cache '
+                '(key TEXT PRIMARY KEY, value BLOB, size INTEGER, expires REAL, used REAL)',
+            )
+
+    def get(self, key: str) -> Optional[bytes]:
+        now = time.time()
+        with self._connect() as connection:
+            row = connection.execute('SELECT value, expires FROM sitemap_cache WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+
+            if row[1] <= now:
+                connection.execute('DELETE FROM sitemap_cache WHERE key = ?', (key,))
+                return None
+
+            connection.execute('UPDATE sitemap_cache SET used = ? WHERE key = ?', (now, key))
+            return bytes(row[0])
+
+    def set(self, key: str, value: bytes):
+        with self._connect() as connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO sitemap_cache VALUES (?, ?, ?, ?, ?)',
+                (key, value, len(value), self._get_expires(), time.time()),
+            )
+            if self.max_size:
+                self._evict(connection)
+
+    def delete(self, key: str):
+        with self._connect() as connection:
+            connection.execute('DELETE FROM sitemap_cache WHERE key = ?', (key,))
+
+    def clear(self):
+        with self._connect() as connection:
+            connection.execute('DELETE FROM sitemap_cache')
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Get a connection committing a transaction on exit."""
+        connection = sqlite3.connect(self.filename, timeout=30)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def _evict(self, connection: sqlite3.Connection):
+        connection.execute('DELETE FROM sitemap_cache WHERE expires <= ?', (time.time(),))
+        size = 0
+        evicted = []
+
+        for key, value_size in connection.execute('SELECT key, size FROM sitemap_cache ORDER BY used DESC'):
+            size += value_size
+            if size > self.max_size:    # type: ignore
+                evicted.append((key,))
+
+        connection.executemany('DELETE FROM sitemap_cache WHERE key = ?', evicted)
@@ -0,0 +1,219 @@
+"""Command line interface to generate static sitemaps, e.g. from cron.
+
+A factory is a callable returning a configured sitemap or a sitemap itself,
+so an application does not have to be started to write its sitemap:
+
+    # myapp/sitemap.py
+    def create_sitemap():
+        app = create_app()
+        sitemap = FlaskSitemap(app, 'https://mysite.com', orm='sqlalchemy')
+        sitemap.add_rule('/blog', Post, loc_from='slug', lastmod_from='updated')
+        return sitemap
+
+    $ python -m dynamic_sitemap myapp.sitemap:create_sitemap -o static/sitemap.xml --workers 8
+
+Sitemaps with more than config.MAX_ITEMS URLs are split into shards rendered by processes.
+"""
+import argparse
+import logging
+import os
+import sys
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor  # noqa: F401
+from contextlib import ExitStack, contextmanager
+from importlib import import_module
+from operator import itemgetter
+from time import perf_counter
+from typing import (  # noqa: F401
+    Any, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple,
+)
+
+from .core import ConfigurableSitemap, DynamicSitemapBase
+from .exceptions import SitemapValidationError
+from .items import SitemapItem
+from .renderers import (
+    RendererBase, Shard, ShardBounds, ShardFile, SitemapXMLRenderer,
+)
+
+
+logger = logging.getLogger(__name__)
+Row = Tuple[str, Optional[str], Optional[str], Optional[float]]
+
+
+def load_object(path: str) -> Any:
+    """Import an object by a path like 'package.module:name'."""
+    module_name, _, name = path.partition(':')
+    if not (module_name and name):
+        raise SitemapValidationError(f'A path should be like "package.module:name": {path}')
+
+    obj = import_module(module_name)
+    for attr in name.split('.'):
+        obj = getattr(obj, attr)
+    return obj
+
+
+def get_sitemap(factory: str, config: str = None) -> ConfigurableSitemap:
+    """Get a sitemap from a factory and update its configuration.
+
+    :param factory: a path to a sitemap or a callable returning it
+    :param config: a path to a configuration class
+    """
+    obj = load_object(factory)
+    sitemap = obj if isinstance(obj, ConfigurableSitemap) else obj()
+
+    if not isinstance(sitemap, ConfigurableSitemap):
+        raise SitemapValidationError(f'{factory} is not a sitemap or a factory of it')
+
+    if config:
+        sitemap.config.from_object(load_object(config))
+    return sitemap
+
+
+def count_urls(sitemap: ConfigurableSitemap) -> Dict[str, int]:
+    """Count URLs of every rule fetching only locations."""
+    counts = {}
+
+    if isinstance(sitemap, DynamicSitemapBase):
+        with sitemap._get_context():
+            for rule, plan in sitemap._get_plans().items():
+                model, attrs = sitemap._get_model(rule, plan.prefix)
+                rows = sitemap.fetch(model, [attrs['loc_from']], attrs['batch_size'])
+                counts[rule] = sum(1 for _ in rows)
+
+    counts['static'] = len(sitemap._get_static_items())
+    return counts
+
+
+def render_shard(filename: str, rows: Sequence[Row], max_size: int, digest: Optional[str] = None) -> Shard:
+    """Write a shard of ordered items in a process.
+
+    :param filename: a path to write the shard
+    :param rows: values of items
+    :param max_size: a maximum uncompressed size of the shard in bytes
+    :param digest: a hash of the previous shard content, it is not rewritten if the content is the same
+    """
+    items = [SitemapItem.from_validated(*row) for row in rows]
+    data = b''.join(SitemapXMLRenderer(items, 'none').iter_bytes())
+
+    if len(data) > max_size:
+        raise SitemapValidationError(f'{filename} takes {len(data)} bytes, decrease MAX_ITEMS to fit into {max_size}')
+
+    file = ShardFile(filename, digest)
+    with file:
+        file.write(data)
+    return Shard(filename, rows[0][0], rows[-1][0], len(rows), file.digest, file.changed)
+
+
+@contextmanager
+def open_renderer(sitemap: ConfigurableSitemap) -> Iterator[RendererBase]:
+    """Build a sitemap and get its renderer. Models of dynamic sitemaps are queried in their context."""
+    with ExitStack() as stack:
+        if isinstance(sitemap, DynamicSitemapBase):
+            stack.enter_context(sitemap._get_context())
+        yield stack.enter_context(sitemap._open_renderer())
+
+
+def generate(sitemap: ConfigurableSitemap, renderer: RendererBase, filename: str, workers: int = None) -> List[str]:
+    """Write a sitemap rendering its shards in processes.
+    Chunks of items are submitted as they are read, so only a few of them are in memory at a time.
+
+    :param sitemap: a sitemap to write
+    :param renderer: a renderer of the built sitemap
+    :param filename: a path to write the sitemap or the index of shards
+    :param workers: a number of processes, all the CPUs are used if None
+    :returns written files
+    """
+    max_items, max_size = sitemap.config.MAX_ITEMS, sitemap.config.MAX_SIZE
+
+    if len(renderer.items) <= max_items:
+        renderer.write(filename)
+        return [filename]
+
+    manifest = sitemap._load_manifest(filename)
+    digests, lasts = sitemap._get_previous_shards(filename, manifest)
+    bounds = ShardBounds(sitemap._get_shard_namer(filename), lasts)
+    rows = ((i.loc, i.lastmod, i.changefreq, i.priority) for i in renderer.get_ordered())    # type: ignore
+    chunks = bounds.split(rows, max_items, itemgetter(0))
+    tasks = ((name, chunk, max_size, digests.get(name)) for name, chunk in chunks)
+
+    if workers == 1:
+        shards = [render_shard(*task) for task in tasks]
+    else:
+        shards = _render_in_processes(tasks, workers or os.cpu_count() or 1)
+
+    for shard in shards:
+        logger.info('%s: %d items, %s', shard.filename, shard.count, 'written' if shard.changed else 'not changed')
+
+    sitemap._write_index(filename, shards, manifest)
+    return [shard.filename for shard in shards] + [filename]
+
+
+def _render_in_processes(tasks: Iterable[tuple], workers: int) -> List[Shard]:
+    """Render shards keeping no more than two tasks per process submitted."""
+    shards = []
+    pending = deque()    # type: Deque[Future]
+
+    with ProcessPoolExecutor(workers) as executor:
+        for task in tasks:
+            pending.append(executor.submit(render_shard, *task))
+            if len(pending) >= workers * 2:
+                shards.append(pending.popleft().result())
+
+        shards.extend(future.result() for future in pending)
+
+    return shards
+
+
+def _print_counts(counts: Dict[str, int]):
+    width = max(map(len, counts))
+    for rule, count in counts.items():
+        print(f'{rule:<{width}}  {count:>12,}')
+    print(f'{"total":<{width}}  {sum(counts.values()):>12,}')
+
+
+def _print_summary(sitemap: ConfigurableSitemap, count: int, fetched: float, rendered: float, files: List[str]):
+    if isinstance(sitemap, DynamicSitemapBase):
+        width = max(map(len, sitemap.stats.rules), default=0)
+        for rule, stats in sitemap.stats.rules.items():
+            print(f'{rule:<{width}}  {stats.rows:>12,} rows  {stats.seconds:8.3f} s')
+
+    print(f'Fetched {count:,} URLs in {fetched:.3f} s ({count / max(fetched, 1e-9):,.0f} URLs/s)')
+    print(f'Rendered {len(files)} files in {rendered:.3f} s ({count / max(rendered, 1e-9):,.0f} URLs/s)')
+    for file in files:
+        print(f'  {file}  {os.path.getsize(file):,} bytes')
+
+
+def main(args: Sequence[str] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog='python -m dynamic_sitemap',
+        description='Generate a static sitemap.',
+    )
+    parser.add_argument('factory', help='a path to a sitemap or a callable returning it, e.g. "myapp.sitemap:create"')
+    parser.add_argument('-c', '--config', help='a path to a configuration class, e.g. "myapp.config:SitemapConfig"')
+    parser.add_argument('-o', '--output', default='sitemap.xml', help='a file to write, config.FILENAME by default')
+    parser.add_argument('-w', '--workers', type=int, help='processes rendering shards, all the CPUs by default')
+    parser.add_argument('--dry-run', action='store_true', help='only count URLs of every rule')
+    parser.add_argument('-v', '--verbose', action='store_true', help='log progress')
+    options = parser.parse_args(args)
+
+    logging.basicConfig(level=logging.INFO if options.verbose else logging.WARNING)
+    sitemap = get_sitemap(options.factory, options.config)
+
+    if options.dry_run:
+        _print_counts(count_urls(sitemap))
+        return 0
+
+    started = perf_counter()
+    with open_renderer(sitemap) as renderer:
+        fetched = perf_counter() - started
+        started = perf_counter()
+        files = generate(sitemap, renderer, sitemap._get_filename(options.output), options.workers)
+        rendered = perf_counter() - started
+        count = len(renderer.items)
+
+    _print_summary(sitemap, count, fetched, rendered, files)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
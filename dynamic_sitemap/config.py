@@ -3,6 +3,7 @@ from typing import Optional, Union
 
 from . import helpers
 from .exceptions import SitemapValidationError
+from .renderers import ORDERS
 from .validators import ChangeFrequency, Priority, Timezone
 
 
@@ -20,6 +21,42 @@ class SitemapConfig(dict):
     IGNORED: set = {'/sitemap.xml', '/admin', '/static'}
     #: int or float, hours; if set, will use already generated data
     CACHE_PERIOD: Union[int, float] = 0
+    #: int or float, hours; how long expired data may be served while it is refreshed in background, 0 is unlimited
+    MAX_STALENESS: Union[int, float] = 0
+    #: int or float, seconds; how long requests wait for data rebuilt by another thread before using the previous one
+    REBUILD_TIMEOUT: Union[int, float] = 10
+    #: int, a number of threads fetching rules concurrently; rules are fetched one by one if less than 2
+    FETCH_WORKERS: int = 0
+    #: int, a default number of rows fetched by a query of keyset pagination; 0 fetches all rows by one query
+    FETCH_BATCH_SIZE: int = 0
+    #: int, a maximum number of URLs in a single sitemap file when writing shards
+    MAX_ITEMS: int = 50000
+    #: int, bytes; a maximum uncompressed size of a single sitemap file when writing shards
+    MAX_SIZE: int = 50 * 1024 * 1024
+    #: str, a URL where sitemap shards are served from; BASE_URL is used if not set
+    SHARDS_URL: str = ''
+    #: str, a path to a manifest of written shards; if set, shards are cut after the same locations as before
+    #: while items are ordered by location, so only shards with changed content are rewritten;
+    #: the index page is then modified with the latest page instead of the start time
+    MANIFEST: str = ''
+    #: int, a number of items kept in memory while writing a sitemap; if set, items are sorted in runs
+    #: spilled to temporary files and merged in ORDER, so a written sitemap is bounded by disk rather than memory
+    SPILL_ITEMS: int = 0
+    #: str, a directory for temporary files of SPILL_ITEMS; the system one is used if not set
+    SPILL_DIR: str = ''
+    #: float, a false positive rate of a Bloom filter deduplicating spilled items with ORDER 'none',
+    #: so they are not sorted and take a few bytes in memory per URL; a false positive drops a URL
+    BLOOM_ERROR_RATE: float = 0.0
+    #: bool, if set, a sitemap is published to FILENAME and served from it, so processes share one generation;
+    #: the file is published again every CACHE_PERIOD if it is set, shards are served next to the view
+    SERVE_FILE: bool = False
+    #: bool, if set, a sitemap which is not rendered yet is sent while it is rendered, without an ETag;
+    #: data to be built is fetched completely before the first byte is sent
+    STREAM: bool = False
+    #: str, a URL rule to serve statistics in Prometheus text format at, e.g. '/sitemap-metrics'; not served if empty
+    METRICS_RULE: str = ''
+    #: str, an order of URLs in a sitemap: 'loc', 'lastmod' (then 'loc') or 'none' to skip sorting
+    ORDER: str = 'loc'
     #: str, str, the site's local time zone, one of pytz.all_timezones
     TIMEZONE = Timezone(default=None)
     #: str, a change frequency of the index page
@@ -46,27 +83,59 @@ class SitemapConfig(dict):
         self._validate(obj)
 
         for key in dir(obj):
-            if key.isupper():
+            if key.isupper() and not key.startswith('_'):
                 self[key] = getattr(obj, key)
 
     def _validate(self, obj: ConfType):
         if not isinstance(obj, (type, type(self))):
             raise SitemapValidationError('This type of object is not supported yet')
 
-        filename = getattr(obj, 'FILENAME', None)
-        if filename and not Path(filename).parent.exists():
-            raise SitemapValidationError(f'Bad filename: {filename}')
+        for option in ('FILENAME', 'MANIFEST'):
+            filename = getattr(obj, option, None)
+            if filename and not Path(filename).parent.exists():
+                raise SitemapValidationError(f'Bad filename: {filename}')
 
         base_url = getattr(obj, 'BASE_URL', None)
         if base_url and not helpers.check_url(base_url):
             raise SitemapValidationError(f'Bad URL: {base_url}')
 
-        cache_period = getattr(obj, 'CACHE_PERIOD', None)
-        if cache_period and not (
-            isinstance(cache_period, (int, float))
-            and cache_period > 0.0
+        self._validate_numbers(obj)
+
+        order = getattr(obj, 'ORDER', None)
+        if order is not None and order not in ORDERS:
+            raise SitemapValidationError('ORDER should be one of the following: ' + ', '.join(ORDERS))
+
+        shards_url = getattr(obj, 'SHARDS_URL', None)
+        if shards_url and not helpers.check_url(shards_url):
+            raise SitemapValidationError(f'Bad URL: {shards_url}')
+
+    @staticmethod
+    def _validate_numbers(obj: ConfType):
+        for period in ('CACHE_PERIOD', 'MAX_STALENESS'):
+            value = getattr(obj, period, None)
+            if value and not (isinstance(value, (int, float)) and value > 0.0):
+                raise SitemapValidationError(f'{period} should be a float greater than 0.0')
+
+        error_rate = getattr(obj, 'BLOOM_ERROR_RATE', None)
+        if error_rate and not (isinstance(error_rate, float) and 0.0 < error_rate < 1.0):
+            raise SitemapValidationError('BLOOM_ERROR_RATE should be a float between 0.0 and 1.0')
+
+        rebuild_timeout = getattr(obj, 'REBUILD_TIMEOUT', None)
+        if rebuild_timeout is not None and not (
+            isinstance(rebuild_timeout, (int, float))
+            and rebuild_timeout >= 0.0
         ):
-            raise SitemapValidationError('CACHE_PERIOD should be a float greater than 0.0')
+            raise SitemapValidationError('REBUILD_TIMEOUT should be a non-negative float')
+
+        for count in ('FETCH_WORKERS', 'FETCH_BATCH_SIZE', 'SPILL_ITEMS'):
+            value = getattr(obj, count, None)
+            if value is not None and not (isinstance(value, int) and value >= 0):
+                raise SitemapValidationError(f'{count} should be a non-negative integer')
+
+        for limit in ('MAX_ITEMS', 'MAX_SIZE'):
+            value = getattr(obj, limit, None)
+            if value is not None and not (isinstance(value, int) and value > 0):
+                raise SitemapValidationError(f'{limit} should be an integer greater than 0')
 
     def __set__(self, instance, value):
         raise SitemapValidationError(
@@ -0,0 +1,250 @@
+"""This module provides a tool to generate a Sitemap of a Django project.
+
+URL patterns are discovered from the resolver, so create a sitemap in its own module
+and add its views to the URL configuration:
+
+    # myproject/sitemap.py
+    from dynamic_sitemap.contrib.django import DjangoSitemap
+    from blog.models import Post
+
+    class Config:
+        IGNORED = {'/admin'}
+        CACHE_PERIOD = 1
+        STREAM = True
+
+    sitemap = DjangoSitemap('https://mysite.com', config=Config)
+    sitemap.add_rule('/blog', Post, loc_from='slug', lastmod_from='updated')
+
+    # myproject/urls.py
+    from .sitemap import sitemap
+
+    urlpatterns = [
+        path('blog/<slug:slug>/', views.post),
+        ...
+    ] + sitemap.urls
+
+Paths without converters, such as 'about/', are added as static items unless they are ignored.
+Rows are fetched with QuerySet.iterator(), so model instances are not kept in memory.
+With config.STREAM set, a sitemap which is not rendered yet is sent by StreamingHttpResponse.
+"""
+import logging
+import os
+import re
+from contextlib import contextmanager
+from typing import (
+    TYPE_CHECKING, Any, ContextManager, Dict, Iterator, List, Optional,
+    Sequence, Union,
+)
+
+from .. import helpers
+from ..config import ConfType
+from ..core import RULE_EXP, DynamicSitemapBase, RulePlan
+from ..stats import PROMETHEUS_CONTENT_TYPE
+
+
+if TYPE_CHECKING:    # pragma: no cover
+    from ..cache import CacheBase
+
+
+logger = logging.getLogger(__name__)
+# a regular expression pattern is a rule only if it matches a single path
+_LITERAL_REGEX = re.compile(r'\^?([^\\.^$*+?{}\[\]|()]*)\$?')
+_GZIP_EXP = re.compile(r'\bgzip\b')
+
+
+class DjangoSitemap(DynamicSitemapBase):
+    """The sitemap generator for a Django project.
+
+    :param base_url: a base URL such as 'http://site.com'
+    :param items: list of strings or dicts to generate static sitemap items
+    :param config: a class with configurations
+    :param orm: an ORM name used in project
+    :param cache: a cache to share rendered sitemaps and items of rules, e.g. between processes
+    :param urlconf: a module of URL patterns to discover rules from, settings.ROOT_URLCONF by default
+    """
+
+    endpoint = 'dynamic_sitemap'
+    rule = '/sitemap.xml'
+
+    def __init__(self,
+                 base_url: str = '',
+                 items: Sequence[Union[dict, str]] = (),
+                 config: ConfType = None,
+                 orm: str = 'django',
+                 cache: 'CacheBase' = None,
+                 urlconf: str = None):
+        super().__init__(base_url, items, config, orm, cache)
+        self.urlconf = urlconf
+        self._discovered = False
+
+    @property
+    def urls(self) -> list:
+        """URL patterns of the sitemap views to add to the URL configuration."""
+        from django.urls import path
+
+        urls = [path(self.rule.lstrip('/'), self.view, name=self.endpoint)]
+
+        if self.config.SERVE_FILE:
+            urls.append(path(self._get_shards_rule().lstrip('/'), self.shard_view, name=f'{self.endpoint}_shard'))
+
+        if self.config.METRICS_RULE:
+            urls.append(path(self.config.METRICS_RULE.lstrip('/'), self.metrics_view, name=f'{self.endpoint}_metrics'))
+        return urls
+
+    def get_rules(self) -> List[str]:
+        """Return a list of URL rules such as '/blog/<slug:slug>/'."""
+        from django.urls import get_resolver
+
+        return list(_iter_rules(get_resolver(self.urlconf).url_patterns))
+
+    def view(self, request):
+        """Generate a response such as Django views do.
+        Answers with 304 Not Modified if a client already has the actual version.
+        With config.SERVE_FILE set, the published file is sent.
+        With config.STREAM set, a sitemap which is not rendered yet is streamed.
+        """
+        from django.http import HttpResponse
+        from django.utils.cache import (
+            get_conditional_response, patch_vary_headers,
+        )
+        from django.utils.http import http_date, quote_etag
+
+        if self.config.SERVE_FILE:
+            return self._send_published(request)
+
+        encoding = 'gzip' if _GZIP_EXP.search(request.headers.get('Accept-Encoding', '')) else None
+
+        if self.config.STREAM:
+            rendered = self._get_ready_rendered(encoding)
+            if rendered is None:
+                return self._stream(request, encoding)
+        else:
+            rendered = self._get_rendered(encoding)
+
+        response = HttpResponse(rendered.data, content_type=self.content_type)
+        patch_vary_headers(response, ['Accept-Encoding'])
+        response.headers['ETag'] = quote_etag(rendered.etag)
+        response.headers['Last-Modified'] = http_date(rendered.modified_at.timestamp())
+
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+
+        logger.info(f'Sitemap requested by {request.META.get("REMOTE_ADDR")}')
+        return get_conditional_response(
+            request,
+            etag=response.headers['ETag'],
+            last_modified=int(rendered.modified_at.timestamp()),
+            response=response,
+        )
+
+    def shard_view(self, request, number: int):
+        """Send a published shard of a sitemap split by config.MAX_ITEMS."""
+        from django.http import Http404
+
+        filename = self._get_published_shard(number)
+        if filename is None:
+            raise Http404('Sitemap shard is not found')
+        return self._send_file(request, filename)
+
+    def metrics_view(self, request):
+        """Answer with statistics in Prometheus text format."""
+        from django.http import HttpResponse
+
+        return HttpResponse(self.stats.to_prometheus(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+    def _get_rules(self) -> list:
+        """Discover rules once. Paths without converters are not rules, they are added as items
+        unless they are ignored or served by the sitemap itself.
+        """
+        if not self._discovered:
+            self._discovered = True
+            ignored = helpers.PrefixMatcher(self.config.IGNORED)
+            # the index page is added with its own change frequency and priority
+            own = {'/', self.rule, self.config.METRICS_RULE}
+
+            for rule in self.get_rules():
+                if RULE_EXP.search(rule):
+                    self._rules.append(rule)
+                elif rule not in own and not ignored.match(rule):
+                    self.initial_items.append(rule)
+        return self._rules
+
+    def _get_plans(self) -> Dict[str, RulePlan]:
+        # the URL configuration may import the sitemap, so rules are discovered on the first use
+        self._get_rules()
+        return super()._get_plans()
+
+    def _get_context(self) -> ContextManager:
+        return _closing_connections()
+
+    def _stream(self, request, encoding: Optional[str]):
+        """Send a sitemap by chunks while it is rendered. There is no ETag until it is cached."""
+        from django.http import StreamingHttpResponse
+        from django.utils.cache import patch_vary_headers
+
+        response = StreamingHttpResponse(self._iter_rendered(encoding), content_type=self.content_type)
+        patch_vary_headers(response, ['Accept-Encoding'])
+
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+
+        logger.info(f'Sitemap requested by {request.META.get("REMOTE_ADDR")}, streaming')
+        return response
+
+    def _send_published(self, request):
+        """Send the published file publishing it again if it is expired."""
+        return self._send_file(request, self._get_published())
+
+    def _send_file(self, request, filename: str):
+        """Send a published file, web servers may do it with sendfile."""
+        from django.http import FileResponse
+        from django.utils.cache import get_conditional_response
+        from django.utils.http import http_date
+
+        filename = os.path.abspath(filename)
+        content_type = 'application/gzip' if filename.endswith('.gz') else self.content_type
+        modified = int(os.path.getmtime(filename))
+        logger.info(f'Sitemap file {os.path.basename(filename)} requested by {request.META.get("REMOTE_ADDR")}')
+
+        # the file is opened only when it is sent, a 304 response would leave it open
+        response = get_conditional_response(request, last_modified=modified)
+        if response is None:
+            response = FileResponse(open(filename, 'rb'), content_type=content_type)
+        response.headers['Last-Modified'] = http_date(modified)
+        return response
+
+
+def _iter_rules(patterns: Sequence[Any], prefix: str = '/') -> Iterator[str]:
+    """Yield rules of URL patterns including nested ones.
+    Regular expression patterns are skipped unless they match a single path.
+    """
+    from django.urls.resolvers import RoutePattern, URLResolver
+
+    for pattern in patterns:
+        if isinstance(pattern.pattern, RoutePattern):
+            route = str(pattern.pattern)
+        else:
+            match = _LITERAL_REGEX.fullmatch(str(pattern.pattern))
+            if not match:
+                logger.debug(f'Skipped a regular expression pattern {pattern.pattern}')
+                continue
+            route = match.group(1)
+
+        if isinstance(pattern, URLResolver):
+            yield from _iter_rules(pattern.url_patterns, prefix + route)
+        else:
+            yield prefix + route
+
+
+@contextmanager
+def _closing_connections() -> Iterator[None]:
+    """Close database connections which are expired or broken as Django does around requests,
+    so threads querying models out of requests do not keep them.
+    """
+    from django.db import close_old_connections
+
+    close_old_connections()
+    try:
+        yield
+    finally:
+        close_old_connections()
@@ -36,11 +36,15 @@ Also you can set configurations from your class:
     sitemap.write()
 """
 import logging
-from typing import List, Sequence, Union
+import os
+from typing import (
+    TYPE_CHECKING, ContextManager, List, Optional, Sequence, Union,
+)
 
 from ..config import ConfType
 from ..core import DynamicSitemapBase
 from ..exceptions import SitemapValidationError
+from ..stats import PROMETHEUS_CONTENT_TYPE
 
 
 try:
@@ -48,6 +52,9 @@ try:
 except ImportError:
     Flask = object    # type: ignore
 
+if TYPE_CHECKING:    # pragma: no cover
+    from ..cache import CacheBase
+
 
 logger = logging.getLogger(__name__)
 
@@ -60,6 +67,7 @@ class FlaskSitemap(DynamicSitemapBase):
     :param items: list of strings or dicts to generate static sitemap items
     :param config: a class with configurations
     :param orm: an ORM name used in project
+    :param cache: a cache to share rendered sitemaps and items of rules, e.g. between processes
 
     :raises: SitemapValidationError - if ORM extension is not found.
     """
@@ -72,14 +80,21 @@ class FlaskSitemap(DynamicSitemapBase):
                  base_url: str = '',
                  items: Sequence[Union[dict, str]] = (),
                  config: ConfType = None,
-                 orm: str = None):
-        super().__init__(base_url, items, config, orm)
+                 orm: str = None,
+                 cache: 'CacheBase' = None):
+        super().__init__(base_url, items, config, orm, cache)
         self.app = app
 
         if orm and not app.extensions.get(orm.casefold()):
             raise SitemapValidationError(f'{orm} extension is not found')
         app.add_url_rule(self.rule, self.endpoint, self.view)
 
+        if self.config.SERVE_FILE:
+            app.add_url_rule(self._get_shards_rule(), f'{self.endpoint}_shard', self.shard_view)
+
+        if self.config.METRICS_RULE:
+            app.add_url_rule(self.config.METRICS_RULE, f'{self.endpoint}_metrics', self.metrics_view)
+
     def get_rules(self) -> List[str]:
         """Return a list of URL rules."""
         return [
@@ -87,12 +102,83 @@ class FlaskSitemap(DynamicSitemapBase):
             if (rule_obj.methods and 'GET' in rule_obj.methods)
         ]
 
+    def _get_context(self) -> ContextManager:
+        return self.app.app_context()
+
     def view(self):
-        """Generate a response such as Flask views do."""
+        """Generate a response such as Flask views do.
+        Answers with 304 Not Modified if a client already has the actual version.
+        With config.SERVE_FILE set, the published file is sent.
+        With config.STREAM set, a sitemap which is not rendered yet is streamed.
+        """
         from flask import make_response, request
 
-        self._get_items()
-        response = make_response(self.render())
+        if self.config.SERVE_FILE:
+            return self._send_published()
+
+        encoding = 'gzip' if request.accept_encodings['gzip'] else None
+
+        if self.config.STREAM:
+            rendered = self._get_ready_rendered(encoding)
+            if rendered is None:
+                return self._stream(encoding)
+        else:
+            rendered = self._get_rendered(encoding)
+
+        response = make_response(rendered.data)
         response.headers['Content-Type'] = self.content_type
+        response.vary.add('Accept-Encoding')
+        response.set_etag(rendered.etag)
+        response.last_modified = rendered.modified_at
+
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+
         logger.info(f'Sitemap requested by {request.remote_addr}')
+        return response.make_conditional(request)
+
+    def shard_view(self, number: int):
+        """Send a published shard of a sitemap split by config.MAX_ITEMS."""
+        from flask import abort
+
+        filename = self._get_published_shard(number)
+        if filename is None:
+            abort(404)
+        return self._send_file(filename)
+
+    def metrics_view(self):
+        """Answer with statistics in Prometheus text format."""
+        from flask import make_response
+
+        response = make_response(self.stats.to_prometheus())
+        response.headers['Content-Type'] = PROMETHEUS_CONTENT_TYPE
+        return response
+
+    def _stream(self, encoding: Optional[str]):
+        """Send a sitemap by chunks while it is rendered. There is no ETag until it is cached."""
+        from flask import Response, request
+
+        # data is built here, so a failed build is answered with an error instead of a truncated sitemap
+        response = Response(self._iter_rendered(encoding), content_type=self.content_type)
+        response.vary.add('Accept-Encoding')
+
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+
+        logger.info(f'Sitemap requested by {request.remote_addr}, streaming')
+        return response
+
+    def _send_published(self):
+        """Send the published file publishing it again if it is expired."""
+        return self._send_file(self._get_published())
+
+    def _send_file(self, filename: str):
+        """Send a published file, web servers may do it with sendfile."""
+        from flask import request, send_file
+
+        filename = os.path.abspath(filename)
+        mimetype = 'application/gzip' if filename.endswith('.gz') else self.content_type
+        logger.info(f'Sitemap file {os.path.basename(filename)} requested by {request.remote_addr}')
+        response = send_file(filename, mimetype=mimetype, conditional=True)
+        response.headers['Content-Type'] = mimetype
         return response
@@ -1,24 +1,53 @@
+import atexit
+import gzip
+import hashlib
+import json
 import logging
+import os
 import re
+import threading
+import zlib
 from abc import ABC, abstractmethod
-from datetime import datetime, timedelta
-from typing import List, Sequence, Set, Type, Union
-from urllib.parse import urljoin
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager, suppress
+from datetime import datetime, timedelta, timezone
+from itertools import chain
+from operator import attrgetter
+from pathlib import Path
+from time import perf_counter, time
+from typing import (
+    TYPE_CHECKING, BinaryIO, Callable, ContextManager, Dict, Iterable,
+    Iterator, List, Optional, Sequence, Set, Tuple, Type, Union,
+)
+from urllib.parse import urljoin, urlparse
 
 from . import config as conf
 from . import helpers
+from .dedup import BloomFilter, unique
 from .exceptions import (
     SitemapIOError, SitemapItemError, SitemapValidationError,
 )
 from .helpers import Model, ORMModel
 from .items import SitemapIndexItem, SitemapItem, SitemapItemBase
+from .locks import FileLock
+from .refresh import Refresher
 from .renderers import (
-    RendererBase, SitemapIndexXMLRenderer, SitemapXMLRenderer,
+    COMPRESS_LEVEL, AtomicFile, RendererBase, Shard, SitemapIndexXMLRenderer,
+    SitemapXMLRenderer,
 )
-from .validators import get_validated
+from .spill import ExternalSorter
+from .stats import RuleStats, SitemapStats
+from .validators import LastModified, get_validated
+
+
+if TYPE_CHECKING:    # pragma: no cover
+    from .cache import CacheBase
 
 
 logger = logging.getLogger(__name__)
+# values of a shard entry in the manifest
+_MANIFEST_KEYS = {'first', 'last', 'count', 'digest', 'lastmod'}
 
 
 class SitemapBase:
@@ -37,17 +66,26 @@ class SitemapBase:
         renderer = self._get_renderer()
         return renderer.render()
 
+    def iter_bytes(self) -> Iterator[bytes]:
+        """Get an encoded sitemap representation chunk by chunk."""
+        renderer = self._get_renderer()
+        return renderer.iter_bytes()
+
+    def stream(self, file: BinaryIO):
+        """Write a sitemap to a file-like object chunk by chunk."""
+        renderer = self._get_renderer()
+        renderer.stream(file)
+
     def write(self, filename: str = 'sitemap.xml'):
         """Write a sitemap to a file."""
-        renderer = self._get_renderer()
-        try:
-            renderer.write(filename)
-        except FileNotFoundError:
-            error = f'Path "{filename}" is not found or credentials required.'
-            logger.exception(error)
-            raise SitemapIOError(error)
-        else:
-            logger.info('Static sitemap is ready: %s', filename)
+        with self._open_renderer() as renderer:
+            try:
+                renderer.write(filename)
+            except FileNotFoundError:
+                error = f'Path "{filename}" is not found or credentials required.'
+                logger.exception(error)
+                raise SitemapIOError(error)
+        logger.info('Static sitemap is ready: %s', filename)
 
     def add_items(self, *items: Union[dict, str]):
         """Add static items to a sitemap."""
@@ -59,6 +97,11 @@ class SitemapBase:
         self.initialized = True
         return self.renderer_cls(self._get_items())
 
+    @contextmanager
+    def _open_renderer(self) -> Iterator[RendererBase]:
+        """Get a renderer to write a sitemap, resources it holds are released after writing."""
+        yield self._get_renderer()
+
     def _get_items(self):
         if not self.items:
             self.items = helpers.get_items(self.initial_items, self.item_cls, self.url)
@@ -89,41 +132,243 @@ class ConfigurableSitemap(SimpleSitemap):
         super().__init__(base_url, items)
         self.config.from_object(config)
         self.started_at = helpers.get_iso_datetime(datetime.now(), self.config.TIMEZONE)
+        self._static_items = None         # type: Optional[Set[SitemapItem]]
 
     def write(self, filename: str = 'sitemap.xml'):
-        if filename == 'sitemap.xml' or not filename:
-            filename = self.config.FILENAME or filename
-        super().write(filename)
+        super().write(self._get_filename(filename))
+
+    def write_sharded(self, filename: str = 'sitemap.xml') -> List[str]:
+        """Write a sitemap split into files within config.MAX_ITEMS and config.MAX_SIZE limits
+        and a sitemap index pointing at them.
+
+        Shards are named after the index file: 'sitemap.xml' produces
+        'sitemap-1.xml', 'sitemap-2.xml' and so on in the same directory.
+        Shards of 'sitemap.xml.gz' are compressed as well.
+
+        :param filename: a path to write the sitemap index
+        :returns a list of written shards
+        """
+        filename = self._get_filename(filename)
+        if not filename:
+            raise SitemapValidationError('Filename is not provided.')
+
+        with self._open_renderer() as renderer:
+            return self._write_sharded(renderer, filename)
 
     def ignore(self, *patterns):
         """Add URLs which would be igrnored."""
         self.config.IGNORED = set(patterns)
 
-    def _get_items(self):
-        if self.initialized:
-            return self.items
-
-        self.items = helpers.get_items(
-            self.initial_items,
-            self.item_cls,
-            self.url,
-            self.config.ALTER_CHANGES,
-            self.config.ALTER_PRIORITY,
+    def _write_sharded(self, renderer: RendererBase, filename: str) -> List[str]:
+        manifest = self._load_manifest(filename)
+        digests, lasts = self._get_previous_shards(filename, manifest)
+
+        try:
+            shards = list(renderer.iter_shards(    # type: ignore
+                self._get_shard_namer(filename),
+                self.config.MAX_ITEMS,
+                self.config.MAX_SIZE,
+                digests,
+                lasts,
+            ))
+        except FileNotFoundError:
+            error = f'Path "{filename}" is not found or credentials required.'
+            logger.exception(error)
+            raise SitemapIOError(error)
+
+        self._write_index(filename, shards, manifest)
+        return [shard.filename for shard in shards]
+
+    def _get_shard_namer(self, filename: str) -> Callable[[int], str]:
+        """Get a function naming shards after an index file by their numbers."""
+        path = Path(filename)
+        return lambda number: str(path.with_name(get_shard_name(path.name, number)))
+
+    def _get_previous_shards(self, filename: str, manifest: Dict[str, dict]) -> Tuple[Dict[str, str], Dict[str, str]]:
+        """Get hashes and the last locations of shards of the manifest by their paths.
+        Shards are cut at the previous locations only if items are rendered by location.
+        """
+        path = Path(filename)
+        digests = {str(path.with_name(name)): entry['digest'] for name, entry in manifest.items()}
+        lasts = {}
+
+        if self.config.ORDER == 'loc':
+            lasts = {str(path.with_name(name)): entry['last'] for name, entry in manifest.items()}
+        return digests, lasts
+
+    def _write_index(self, filename: str, shards: List[Shard], manifest: Dict[str, dict] = None):
+        """Write an index of shards. With config.MANIFEST set, unchanged shards keep their lastmod,
+        shards left from the previous writing are removed and the index is kept if nothing is changed.
+
+        :param filename: a path to write the index
+        :param shards: written shards
+        :param manifest: entries of the manifest loaded before writing shards
+        """
+        manifest = manifest or {}
+        now = self.started_at
+        if self.config.MANIFEST:
+            now = helpers.get_iso_datetime(datetime.now(), self.config.TIMEZONE)
+        entries = {}
+
+        for shard in shards:
+            name = Path(shard.filename).name
+            previous = manifest.get(name)
+            entries[name] = {
+                'first': shard.first,
+                'last': shard.last,
+                'count': shard.count,
+                'digest': shard.digest,
+                'lastmod': previous['lastmod'] if previous and not shard.changed else now,
+            }
+
+        for name in manifest.keys() - entries.keys():
+            with suppress(FileNotFoundError):
+                os.remove(Path(filename).with_name(name))
+
+        if entries == manifest and os.path.exists(filename):
+            logger.info('Sitemap shards are not changed')
+            return
+
+        shards_url = self.config.SHARDS_URL or self.url
+        index = SimpleSitemapIndex(
+            shards_url,
+            [{'loc': name, 'lastmod': entry['lastmod']} for name, entry in entries.items()],
         )
-        self.items.add(self._get_index())
+        index.write(filename)
+        self._save_manifest(filename, entries)
+        logger.info('Sitemap is split into %d files', len(shards))
+
+    def _load_manifest(self, filename: str) -> Dict[str, dict]:
+        """Get entries of written shards by their names if config.MANIFEST is set and belongs to the index."""
+        if not self.config.MANIFEST:
+            return {}
+
+        try:
+            with open(self.config.MANIFEST) as file:
+                manifest = json.load(file)
+        except FileNotFoundError:
+            return {}
+        except ValueError:
+            logger.warning('Manifest %s is broken, all shards are rewritten', self.config.MANIFEST)
+            return {}
+
+        try:
+            if manifest.get('index') != Path(filename).name:
+                return {}
+            entries = {entry.pop('name'): entry for entry in manifest['shards']}
+            if not all(_MANIFEST_KEYS <= entry.keys() for entry in entries.values()):
+                raise KeyError('Entries of shards are incomplete')
+        except (AttributeError, KeyError, TypeError):
+            logger.warning('Manifest %s is broken, all shards are rewritten', self.config.MANIFEST)
+            return {}
+        return entries
+
+    def _save_manifest(self, filename: str, entries: Dict[str, dict]):
+        if not self.config.MANIFEST:
+            return
+
+        manifest = {
+            'index': Path(filename).name,
+            'shards': [dict(name=name, **entry) for name, entry in entries.items()],
+        }
+        with AtomicFile(self.config.MANIFEST) as file:
+            file.write(json.dumps(manifest, indent=2).encode())
+
+    def _get_renderer(self) -> RendererBase:
+        self.initialized = True
+        return self.renderer_cls(self._get_items(), self.config.ORDER)    # type: ignore
+
+    def _get_filename(self, filename: str) -> str:
+        if filename == 'sitemap.xml' or not filename:
+            filename = self.config.FILENAME or filename
+        return filename
+
+    def _get_items(self):
+        self.items = self._get_static_items()
         return self.items
 
-    def _get_index(self):
-        """Get default index page."""
+    def _get_static_items(self, lastmod: Optional[str] = None) -> Set[SitemapItem]:
+        """Get items added with add_items and the index page.
+
+        :param lastmod: the latest modification of other items, see _get_index
+        """
+        if self._static_items is None:
+            self._static_items = helpers.get_items(    # type: ignore
+                self.initial_items,
+                self.item_cls,
+                self.url,
+                self.config.ALTER_CHANGES,
+                self.config.ALTER_PRIORITY,
+            )
+
+        if self.config.MANIFEST:
+            lastmod = get_latest(self._static_items, lastmod)    # type: ignore
+        return self._static_items | {self._get_index(lastmod)}    # type: ignore
+
+    def _get_index(self, lastmod: Optional[str] = None) -> SitemapItem:
+        """Get default index page modified at the start. With config.MANIFEST set, it is modified
+        when the latest of other pages is, so its shard is not rewritten from one start to another.
+
+        :param lastmod: the latest modification of other pages
+        """
         return SitemapItem(
             urljoin(self.url, '/'),
-            self.started_at,
+            lastmod if self.config.MANIFEST else self.started_at,
             self.config.INDEX_CHANGES,
             self.config.INDEX_PRIORITY,
         )
 
 
 RULE_EXP = re.compile(r'<(\w+:)?\w+>')
+Rendered = namedtuple('Rendered', 'data etag modified_at')
+RulePlan = namedtuple('RulePlan', 'prefix suffix')
+
+
+def get_rule_plan(rule: str) -> RulePlan:
+    """Split a rule into parts before and after its first pattern."""
+    splitted = RULE_EXP.split(rule, maxsplit=1)
+    return RulePlan(splitted[0], splitted[-1])
+
+
+def get_shard_name(name: str, number: Union[int, str]) -> str:
+    """Get a name of a shard of an index file, e.g. 'sitemap-1.xml.gz' of 'sitemap.xml.gz'."""
+    path = Path(name)
+    suffix = ''.join(path.suffixes[-2:]) if path.suffix == '.gz' else path.suffix
+    stem = name[:-len(suffix)] if suffix else name
+    return f'{stem}-{number}{suffix}'
+
+
+def get_latest(items: Iterable[SitemapItem], lastmod: Optional[str] = None) -> Optional[str]:
+    """Get the latest modification of items and the given one if any."""
+    return max(filter(None, chain((lastmod,), map(attrgetter('lastmod'), items))), default=None)
+
+
+def fetch_timed(chunks: Iterator[list], stats: RuleStats) -> Iterator[list]:
+    """Yield chunks of rows recording their number and time spent on fetching them."""
+    while True:
+        started = perf_counter()
+        rows = next(chunks, None)
+        stats.fetch_seconds += perf_counter() - started
+
+        if rows is None:
+            return
+
+        stats.rows += len(rows)
+        yield rows
+
+
+class Snapshot:
+    """Sitemap data published at once. Items are never changed after publishing,
+    documents rendered from them are cached along.
+    Streams are lists of the items ordered by location, if they are prepared.
+    """
+    __slots__ = ('items', 'streams', 'created_at', 'rendered')
+
+    def __init__(self, items: Tuple[SitemapItem, ...], streams: Optional[List[List[SitemapItem]]] = None):
+        self.items = items
+        self.streams = streams
+        self.created_at = datetime.now()
+        self.rendered = {}                # type: Dict[Optional[str], Rendered]
 
 
 class DynamicSitemapBase(ConfigurableSitemap, ABC):
@@ -133,21 +378,32 @@ class DynamicSitemapBase(ConfigurableSitemap, ABC):
                  base_url: str = '',
                  items: Sequence[Union[dict, str]] = (),
                  config: conf.ConfType = None,
-                 orm: str = None):
+                 orm: str = None,
+                 cache: 'CacheBase' = None):
         """An instance of a Sitemap.
 
         :param base_url: base URL such as 'http://site.com'
         :param items: list of strings or dicts to generate static sitemap items
         :param config: a class with configurations
         :param orm: an ORM name used in project (use 'local' and check helpers.Model out for raw SQL queries)
+        :param cache: a cache to share rendered sitemaps and items of rules, e.g. between processes
         """
         super().__init__(base_url, items, config)
-        self.fetch = helpers.get_query(orm)
+        self.fetch = helpers.get_fetcher(orm)
+        self.cache = cache
+        self.stats = SitemapStats()
         self._rules = []                  # type: List[str]
         self._models = {}                 # type: dict
-        self._dynamic_items = set()       # type: Set[SitemapItem]
+        self._plans = {}                  # type: Dict[str, RulePlan]
+        self._plans_key = None            # type: Optional[tuple]
+        self._snapshot = Snapshot(())
+        self._build_lock = threading.Lock()
+        self._etag = ''
+        self._modified_at = datetime.now(timezone.utc)
         self._cached_at = datetime.now()
+        self._refresher = None            # type: Optional[Refresher]
         self.cache_period = timedelta(0)
+        self.max_staleness = timedelta(hours=self.config.MAX_STALENESS or 0)
 
         if self.config.CACHE_PERIOD:
             hours = int(self.config.CACHE_PERIOD)
@@ -167,16 +423,63 @@ class DynamicSitemapBase(ConfigurableSitemap, ABC):
             >>> sitemap.build()
         """
         self._get_rules()
+        self._get_plans()
         self._get_items()
         self.initialized = True
 
+    def start_refresher(self):
+        """Rebuild expired data in a background thread.
+
+        While new data is being prepared, requests get the previous one
+        which is not older than config.MAX_STALENESS after expiration.
+        With config.CACHE_PERIOD set, data is also refreshed periodically.
+        The refresher is stopped on the interpreter exit waiting config.REBUILD_TIMEOUT
+        for the current rebuild, call stop_refresher to stop it earlier.
+        """
+        if self._refresher is None:
+            self._refresher = Refresher(self._refresh, self.cache_period.total_seconds() or None)
+        self._refresher.start()
+        atexit.unregister(self.stop_refresher)
+        atexit.register(self.stop_refresher, self.config.REBUILD_TIMEOUT)
+
+    def stop_refresher(self, timeout: float = None):
+        """Stop the background refresh waiting for the current rebuild to finish.
+
+        :param timeout: seconds to wait for
+        """
+        atexit.unregister(self.stop_refresher)
+        if self._refresher is not None:
+            self._refresher.stop(timeout)
+
+    def publish(self, filename: str = 'sitemap.xml'):
+        """Write a sitemap to a file replacing the previous one atomically.
+        A sitemap with more than config.MAX_ITEMS items is written as shards and an index.
+
+        :param filename: a path to write the sitemap or the index
+        """
+        filename = self._get_filename(filename)
+
+        with self._open_renderer() as renderer:
+            if len(renderer.items) > self.config.MAX_ITEMS:
+                self._write_sharded(renderer, filename)
+                return
+
+            try:
+                renderer.write(filename)
+            except FileNotFoundError:
+                error = f'Path "{filename}" is not found or credentials required.'
+                logger.exception(error)
+                raise SitemapIOError(error)
+        logger.info('Sitemap is published: %s', filename)
+
     def add_rule(self,
                  path: str,
                  model: ORMModel,
                  loc_from: str,
                  lastmod_from: str = None,
                  changefreq: str = None,
-                 priority: float = None):
+                 priority: float = None,
+                 batch_size: int = None):
         """Add a rule to generate urls by a template using a specified model.
 
         :param path: a part of URI is used to get a page generated through a model
@@ -185,6 +488,7 @@ class DynamicSitemapBase(ConfigurableSitemap, ABC):
         :param lastmod_from: an attribute of this model which is an instance of the datetime object
         :param changefreq: how often this URL changes (daily, weekly, etc.)
         :param priority: a priority of URL to be set
+        :param batch_size: if set, rows are fetched by pages of this size in primary key order
         """
         try:
             priority = round(priority or 0.0, 1)
@@ -192,6 +496,9 @@ class DynamicSitemapBase(ConfigurableSitemap, ABC):
             raise SitemapValidationError('Priority should be float.')
         get_validated(loc=path, changefreq=changefreq, priority=priority)
 
+        if batch_size is not None and not (isinstance(batch_size, int) and batch_size > 0):
+            raise SitemapValidationError('Batch size should be an integer greater than 0')
+
         to_check = [loc_from]
         if lastmod_from:
             to_check.append(lastmod_from)
@@ -214,44 +521,425 @@ class DynamicSitemapBase(ConfigurableSitemap, ABC):
                 'lastmod_from': lastmod_from,
                 'changefreq': changefreq or self.config.CONTENT_CHANGES,
                 'priority': priority or self.config.CONTENT_PRIORITY,
+                'batch_size': batch_size or self.config.FETCH_BATCH_SIZE,
             },
         )
 
-    def add_raw_rule(self, path: str, model: Model, changefreq: str = None, priority: float = None):
+    def add_raw_rule(self,
+                     path: str,
+                     model: Model,
+                     changefreq: str = None,
+                     priority: float = None,
+                     batch_size: int = None):
         """Add a rule for non-ORM project.
 
         :param path: a part of URI is used to get a page generated through a model
         :param model: helpers.Model with some extractor
         :param changefreq: how often this URL changes (daily, weekly, etc.)
         :param priority: a priority of URL to be set
+        :param batch_size: if set, the extractor is called for pages of this size, see helpers.Model
         """
-        self.add_rule(path, model, 'slug', 'lastmod', changefreq, priority)
+        self.add_rule(path, model, 'slug', 'lastmod', changefreq, priority, batch_size)
 
     @abstractmethod
     def view(self, *args, **kwargs):
         """The method to override. Should return HTTP response."""
 
     def _get_items(self):
-        dynamic_items = self._get_dynamic_items()
-        static_items = super()._get_items()
-        self.items = dynamic_items ^ static_items
-        return self.items
+        return self._get_snapshot().items
+
+    def _get_renderer(self) -> RendererBase:
+        self.initialized = True
+        return self._get_snapshot_renderer(self._get_snapshot())
+
+    def _get_snapshot_renderer(self, snapshot: Snapshot) -> RendererBase:
+        return self.renderer_cls(snapshot.items, self.config.ORDER, snapshot.streams)    # type: ignore
+
+    @contextmanager
+    def _open_renderer(self) -> Iterator[RendererBase]:
+        """Get a renderer to write a sitemap. With config.SPILL_ITEMS set,
+        items are built out of core and rendered in config.ORDER from temporary files.
+        With config.ORDER 'none' and config.BLOOM_ERROR_RATE set, they are not sorted
+        but rendered in the order they are fetched deduplicated by a Bloom filter.
+        """
+        if not self.config.SPILL_ITEMS:
+            yield self._get_renderer()
+            return
+
+        self.initialized = True
+        seen = None
+        by_lastmod = self.config.ORDER == 'lastmod'
+
+        if self.config.ORDER == 'none' and self.config.BLOOM_ERROR_RATE:
+            seen = BloomFilter(self.config.SPILL_ITEMS, self.config.BLOOM_ERROR_RATE)
+
+        directory = self.config.SPILL_DIR or None
+        with ExternalSorter(self.config.SPILL_ITEMS, directory, seen, by_lastmod) as sorter:
+            self._build_spilled(sorter)
+            yield self.renderer_cls(sorter, 'none')    # type: ignore
+
+    def _get_published(self) -> str:
+        """Get a path of the published sitemap publishing it again if it is expired.
+        Processes publish one at a time, the others use the previous file meanwhile.
+        """
+        filename = self._get_filename('sitemap.xml')
+        if self._is_published(filename):
+            return filename
+
+        # nothing to serve, so wait for the file being published by another process
+        missing = not os.path.exists(filename)
+        lock = FileLock(filename + '.lock')
+
+        if not lock.acquire(blocking=missing):
+            logger.debug('Using the published file while another process updates it')
+            return filename
+
+        try:
+            if not (missing and os.path.exists(filename)) and not self._is_published(filename):
+                self.publish(filename)
+        finally:
+            lock.release()
+
+        return filename
+
+    def _get_published_shard(self, number: int) -> Optional[str]:
+        """Get a path of a published shard by its number, None if there is no such shard."""
+        shard = self._get_shard_namer(self._get_published())(number)
+        return shard if os.path.isfile(shard) else None
+
+    def _get_shards_rule(self) -> str:
+        """Get a URL rule of published shards such as '/sitemap-<int:number>.xml'."""
+        name = get_shard_name(Path(self._get_filename('sitemap.xml')).name, '<int:number>')
+        return '/' + urlparse(urljoin(self.config.SHARDS_URL or self.url, name)).path.lstrip('/')
+
+    def _is_published(self, filename: str) -> bool:
+        """Checks whether a published file exists and is not expired.
+        Without config.CACHE_PERIOD it does not expire and is updated by publish only.
+        """
+        try:
+            modified = os.path.getmtime(filename)
+        except OSError:
+            return False
+
+        period = self.cache_period.total_seconds()
+        return not period or modified + period > time()
+
+    def _get_snapshot(self) -> Snapshot:
+        """Get actual data rebuilding it if needed."""
+        snapshot = self._snapshot
 
-    def _get_dynamic_items(self):
-        """Prepares data to be used by renderer."""
         if self._should_use_cache():
             logger.debug('Using existing data')
-            return self._dynamic_items
+            self.stats.record_cache('data', hit=True)
+            return snapshot
+
+        if self._can_serve_stale():
+            logger.debug('Using stale data while refreshing')
+            self.stats.record_cache('data', hit=True)
+            self._refresher.wake()        # type: ignore
+            return snapshot
+
+        self.stats.record_cache('data', hit=False)
+        return self._rebuild(snapshot)
+
+    def _rebuild(self, stale: Snapshot) -> Snapshot:
+        """Rebuilds data in a single thread. Other threads wait for it
+        no longer than config.REBUILD_TIMEOUT and get the stale data then.
+
+        :param stale: data considered expired by a caller
+        """
+        if self._build_lock.acquire(blocking=False):
+            try:
+                if self._snapshot is not stale:
+                    return self._snapshot
+                return self._build_snapshot()
+            finally:
+                self._build_lock.release()
+
+        logger.debug('Waiting for data being rebuilt by another thread')
+        timeout = self.config.REBUILD_TIMEOUT if stale.items else -1
+
+        if self._build_lock.acquire(timeout=timeout):
+            self._build_lock.release()
+            return self._snapshot
+
+        logger.warning('Using stale data: rebuilding takes more than %s seconds', timeout)
+        return stale
+
+    def _build_snapshot(self) -> Snapshot:
+        """Prepares new data and publishes it. Should be called with the build lock acquired."""
+        started = perf_counter()
+        rules = self._without_ignored()
+        plans = [self._plans[rule] for rule in rules]
+        workers = self.config.FETCH_WORKERS
+
+        if workers > 1 and len(rules) > 1:
+            with ThreadPoolExecutor(workers, thread_name_prefix='sitemap-fetch') as executor:
+                # map keeps the order of rules, so the result does not depend on timings
+                prepared = list(executor.map(self._prepare_rule_in_context, rules, plans))
+        else:
+            prepared = [self._prepare_rule(rule, plan) for rule, plan in zip(rules, plans)]
+
+        rule_stats = {rule: stats for rule, (_, stats) in zip(rules, prepared)}
+        dynamic_items = [items for items, _ in prepared]
+        rules_seconds = perf_counter() - started
+        started = perf_counter()
+
+        latest = get_latest(chain(*dynamic_items)) if self.config.MANIFEST else None
+        static_items = self._get_static_items(latest)
+        streams = None
+
+        if self.config.ORDER == 'loc':
+            # rules' items are sorted while preparing, so rendering merges them instead of sorting
+            streams = dynamic_items + [sorted(static_items, key=attrgetter('loc'))]
+
+        # dynamic items go first to replace static ones with the same location
+        snapshot = Snapshot(tuple(unique(chain(*dynamic_items, static_items))), streams)
+        self._snapshot = snapshot
+        self.items = snapshot.items       # type: ignore
+        self._cached_at = snapshot.created_at
+        phases = {'rules': rules_seconds, 'dedup': perf_counter() - started}
+        self.stats.record_build(rule_stats, phases, len(snapshot.items))
+        return snapshot
+
+    def _build_spilled(self, sorter: ExternalSorter):
+        """Prepares items adding them to a sorter chunk by chunk. Dynamic items go first
+        to replace static ones with the same location. Data of requests is not changed.
+        """
+        started = perf_counter()
+        rule_stats = {}
+        lastmod = None
+
+        for rule, plan in self._get_plans().items():
+            rule_started = perf_counter()
+            rule_stats[rule] = stats = RuleStats()
+            for items in self._iter_rule_items(rule, plan, stats):
+                sorter.add(items)
+                if self.config.MANIFEST:
+                    lastmod = get_latest(items, lastmod)
+            stats.seconds = perf_counter() - rule_started
+            logger.info('Spilled %d items for %s in %.3f s', stats.rows, rule, stats.seconds)
+
+        sorter.add(self._get_static_items(lastmod))
+        self.stats.record_build(rule_stats, {'rules': perf_counter() - started}, len(sorter))
+
+    def _prepare_rule(self, rule: str, plan: RulePlan) -> Tuple[List[SitemapItem], RuleStats]:
+        """Prepares items of a rule.
+
+        :returns items and statistics
+        """
+        logger.debug(f'Preparing items for {rule}')
+        started = perf_counter()
+        stats = RuleStats()
+        items = self._load_rule(rule)
+
+        if items is None:
+            items = self._replace_patterns(rule, plan, stats)
+            self._store_rule(rule, items)
+        else:
+            stats.cached = True
+            stats.rows = len(items)
+
+        if self.config.ORDER == 'loc':
+            sorting = perf_counter()
+            items.sort(key=attrgetter('loc'))
+            stats.sort_seconds = perf_counter() - sorting
+
+        stats.seconds = perf_counter() - started
+        logger.info('Prepared %d items for %s in %.3f s', len(items), rule, stats.seconds)
+        return items, stats
+
+    def _prepare_rule_in_context(self, rule: str, plan: RulePlan) -> Tuple[List[SitemapItem], RuleStats]:
+        with self._get_context():
+            return self._prepare_rule(rule, plan)
+
+    def _get_rendered(self, encoding: str = None) -> Rendered:
+        """Get an encoded sitemap. It is rendered and compressed once per data update.
+        If data is expired, a sitemap from the cache is used while it is there.
+
+        :param encoding: a content encoding, 'gzip' or None
+        """
+        if self.cache is not None and not self._should_use_cache():
+            rendered = self._load_rendered(encoding)
+            if rendered is not None:
+                return rendered
+
+        snapshot = self._get_snapshot()
+
+        if encoding not in snapshot.rendered:
+            snapshot.rendered[encoding] = self._render(snapshot, encoding)
+            self._store_rendered(encoding, snapshot.rendered[encoding], snapshot.created_at)
+
+        return snapshot.rendered[encoding]
+
+    def _get_cache_key(self, *parts: str) -> str:
+        return '|'.join((self.url,) + parts)
 
-        self._dynamic_items.clear()
+    def _load_cached(self, kind: str, name: str) -> Optional[bytes]:
+        """Get a cached value if it is built within config.CACHE_PERIOD, so other processes
+        do not use data expired for this one.
+        """
+        value = self.cache.get(self._get_cache_key(kind, name))    # type: ignore
+        if value is not None:
+            built_at, value = value.split(b'\n', 1)
+            if float(built_at) + self.cache_period.total_seconds() <= time():
+                value = None
+
+        self.stats.record_cache(kind, hit=value is not None)
+        return value
+
+    def _store_cached(self, kind: str, name: str, value: bytes, built_at: datetime):
+        self.cache.set(self._get_cache_key(kind, name), f'{built_at.timestamp()}\n'.encode() + value)    # type: ignore
+
+    def _load_rendered(self, encoding: Optional[str]) -> Optional[Rendered]:
+        value = self._load_cached('rendered', encoding or 'identity')
+        if value is None:
+            return None
+
+        header, data = value.split(b'\n', 1)
+        etag, timestamp = header.decode().split(' ')
+        logger.debug('Using a cached sitemap')
+        return Rendered(data, etag, datetime.fromtimestamp(float(timestamp), timezone.utc))
+
+    def _store_rendered(self, encoding: Optional[str], rendered: Rendered, built_at: datetime):
+        if self.cache is not None:
+            header = f'{rendered.etag} {rendered.modified_at.timestamp()}\n'.encode()
+            self._store_cached('rendered', encoding or 'identity', header + rendered.data, built_at)
+
+    def _load_rule(self, rule: str) -> Optional[List[SitemapItem]]:
+        if self.cache is None:
+            return None
+
+        value = self._load_cached('rule', rule)
+        if value is None:
+            return None
+
+        logger.debug(f'Using cached items for {rule}')
+        return [SitemapItem.from_validated(*values) for values in json.loads(value)]
+
+    def _store_rule(self, rule: str, items: List[SitemapItem]):
+        if self.cache is not None:
+            values = [(i.loc, i.lastmod, i.changefreq, i.priority) for i in items]
+            self._store_cached('rule', rule, json.dumps(values).encode(), datetime.now())
+
+    def _render(self, snapshot: Snapshot, encoding: str = None) -> Rendered:
+        """Renders a snapshot. The last modification time is kept if the content has not changed."""
+        if encoding == 'gzip':
+            if None not in snapshot.rendered:
+                snapshot.rendered[None] = self._render(snapshot)
+            plain = snapshot.rendered[None]
+            started = perf_counter()
+            data = gzip.compress(plain.data, COMPRESS_LEVEL)
+            self.stats.record_render(encoding, perf_counter() - started, len(data))
+            return Rendered(data, f'{plain.etag}-{encoding}', plain.modified_at)
+
+        if encoding is not None:
+            raise SitemapValidationError(f'Encoding is not supported: {encoding}')
+
+        started = perf_counter()
+        data = b''.join(self._get_snapshot_renderer(snapshot).iter_bytes())
+        self.stats.record_render(encoding, perf_counter() - started, len(data))
+        return self._get_rendered_plain(data)
+
+    def _get_rendered_plain(self, data: bytes) -> Rendered:
+        etag = hashlib.blake2b(data, digest_size=16).hexdigest()
+        return Rendered(data, etag, self._get_modified_at(etag))
+
+    def _get_modified_at(self, etag: str) -> datetime:
+        """Get the last modification time, it is kept while the content has the same ETag."""
+        if etag != self._etag:
+            self._etag = etag
+            self._modified_at = datetime.now(timezone.utc).replace(microsecond=0)
+        return self._modified_at
+
+    def _get_ready_rendered(self, encoding: str = None) -> Optional[Rendered]:
+        """Get an encoded sitemap if it is rendered already and data is not to be rebuilt."""
+        if self.cache is not None and not self._should_use_cache():
+            rendered = self._load_rendered(encoding)
+            if rendered is not None:
+                return rendered
+
+        if self._should_use_cache() or self._can_serve_stale():
+            return self._get_snapshot().rendered.get(encoding)
+        return None
+
+    def _iter_rendered(self, encoding: Optional[str] = None) -> Iterator[bytes]:
+        """Get an encoded sitemap by chunks as it is rendered. Data is built before the first chunk,
+        so a failed build is raised before a response starts instead of truncating it.
+        Hence, with data to be built, the first chunk waits for all the rules to be fetched,
+        only rendering overlaps with sending. The document is cached as _render does when it is sent completely.
+
+        :param encoding: a content encoding, 'gzip' or None
+        """
+        if encoding not in (None, 'gzip'):
+            raise SitemapValidationError(f'Encoding is not supported: {encoding}')
+
+        return self._iter_snapshot(self._get_snapshot(), encoding)
+
+    def _iter_snapshot(self, snapshot: Snapshot, encoding: Optional[str]) -> Iterator[bytes]:
+        """Yield an encoded snapshot. A gzipped document is kept in memory without the plain one
+        unless the plain one is shared by a cache.
+        """
+        # 16 + MAX_WBITS makes the gzip container
+        compressor = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS) if encoding else None
+        keep_plain = compressor is None or self.cache is not None
+        plain, compressed = [], []    # type: List[bytes], List[bytes]
+        digest = hashlib.blake2b(digest_size=16)
+        started = perf_counter()
+
+        def encode(data: bytes) -> bytes:
+            digest.update(data)
+            if keep_plain:
+                plain.append(data)
+            if compressor is None:
+                return data
+
+            data = compressor.compress(data)
+            compressed.append(data)
+            return data
+
+        for chunk in self._get_snapshot_renderer(snapshot).iter_bytes():    # type: ignore
+            data = encode(chunk)
+            if data:
+                yield data
 
-        for rule in self._without_ignored():
-            logger.debug(f'Preparing items for {rule}')
-            splitted = RULE_EXP.split(rule, maxsplit=1)
-            replaced = self._replace_patterns(rule, splitted)
-            self._dynamic_items.update(replaced)
+        if compressor is not None:
+            compressed.append(compressor.flush())
+            yield compressed[-1]
 
-        return self._dynamic_items
+        # the time includes waiting for a client to receive chunks
+        seconds = perf_counter() - started
+        etag = digest.hexdigest()
+        rendered = Rendered(b''.join(plain), etag, self._get_modified_at(etag))
+
+        if compressor is not None:
+            if keep_plain:
+                snapshot.rendered.setdefault(None, rendered)
+                self._store_rendered(None, rendered, snapshot.created_at)
+            rendered = Rendered(b''.join(compressed), f'{etag}-{encoding}', rendered.modified_at)
+
+        self.stats.record_render(encoding, seconds, len(rendered.data))
+        snapshot.rendered.setdefault(encoding, rendered)
+        self._store_rendered(encoding, rendered, snapshot.created_at)
+
+    def _refresh(self):
+        with self._build_lock, self._get_context():
+            self._build_snapshot()
+        logger.debug('Sitemap data is refreshed in background')
+
+    def _get_context(self) -> ContextManager:
+        """The method to override. Should return a context required to query models out of a request."""
+        return ExitStack()
+
+    def _can_serve_stale(self) -> bool:
+        """Checks whether expired data may be served while refreshing in background"""
+        if not (self.items and self._refresher and self._refresher.running):
+            return False
+
+        if not self.max_staleness:
+            return True
+
+        return (self._cached_at + self.cache_period + self.max_staleness) >= datetime.now()
 
     def _should_use_cache(self) -> bool:
         """Checks whether to use cache or to update data"""
@@ -274,40 +962,73 @@ class DynamicSitemapBase(ConfigurableSitemap, ABC):
 
     def _without_ignored(self) -> list:
         """Excludes URIs in config.IGNORED from self.rules"""
-        paths = self._rules
-        for ignored in self.config.IGNORED:
-            paths = list(filter(lambda x: not x.startswith(ignored), paths))
-        return paths
+        return list(self._get_plans())
+
+    def _get_plans(self) -> Dict[str, RulePlan]:
+        """Get plans of rules which are not ignored.
+        They are prepared once and reused until rules or ignored URLs change.
+        """
+        key = (tuple(self._rules), frozenset(self.config.IGNORED))
 
-    def _replace_patterns(self, uri: str, splitted: List[str]) -> List[SitemapItem]:
+        if key != self._plans_key:
+            ignored = helpers.PrefixMatcher(self.config.IGNORED)
+            # published shards are served by a rule of the sitemap itself
+            shards_rule = self._get_shards_rule() if self.config.SERVE_FILE else None
+            self._plans = {
+                rule: get_rule_plan(rule)
+                for rule in self._rules if not ignored.match(rule) and rule != shards_rule
+            }
+            self._plans_key = key
+            logger.debug('Prepared plans of %d rules', len(self._plans))
+
+        return self._plans
+
+    def _get_model(self, uri: str, prefix: str) -> helpers.PathModel:
+        """Get a model and attributes added for a rule."""
+        if not self._models.get(prefix):
+            raise SitemapValidationError(
+                f"Add pattern '{uri}' or it's part to ignored or add a new rule with a path '{prefix}'",
+            )
+        return self._models[prefix]
+
+    def _replace_patterns(self, uri: str, splitted: Sequence[str], stats: RuleStats = None) -> List[SitemapItem]:
         """Replaces '/<converter:name>/...' with real URIs
 
         :param uri: a relative URL without base
         :param splitted: a list with parts of URI
+        :param stats: statistics to record rows and fetching time to
         :returns a list of Records
         """
+        prepared = list(chain.from_iterable(self._iter_rule_items(uri, splitted, stats)))
+        logger.debug(f'Included {len(prepared)} items')
+        return prepared
 
+    def _iter_rule_items(self,
+                         uri: str,
+                         splitted: Sequence[str],
+                         stats: RuleStats = None) -> Iterator[List[SitemapItem]]:
+        """Yield items of a rule chunk by chunk as rows are fetched."""
         prefix, suffix = splitted[0], splitted[-1]
-        if not self._models.get(prefix):
-            raise SitemapValidationError(
-                f"Add pattern '{uri}' or it's part to ignored or add a new rule with a path '{prefix}'",
-            )
+        model, attrs = self._get_model(uri, prefix)
+        changefreq, priority = attrs['changefreq'], attrs['priority']
+        format_datetimes = helpers.get_datetime_formatter(self.config.TIMEZONE).format_many
+        fields = [attrs['loc_from']]
 
-        model, attrs = self._models[prefix]
-        prepared = []
+        if attrs['lastmod_from']:
+            fields.append(attrs['lastmod_from'])
 
-        for record in self.fetch(model):
-            path = getattr(record, attrs['loc_from'])
-            loc = helpers.join_url_path(self.url, prefix, path, suffix)
-            lastmod = None
+        stats = stats or RuleStats()
+        chunks = helpers.chunked(self.fetch(model, fields, attrs['batch_size']), helpers.CHUNK_SIZE)
 
-            if attrs['lastmod_from']:
-                lastmod = getattr(record, attrs['lastmod_from'])
-                if isinstance(lastmod, datetime):
-                    lastmod = helpers.get_iso_datetime(lastmod, self.config.TIMEZONE)
+        for rows in fetch_timed(chunks, stats):
+            lastmods = [row[1] if len(row) > 1 else None for row in rows]
+            formatted = iter(format_datetimes([value for value in lastmods if isinstance(value, datetime)]))
+            pairs = []
 
-            item = SitemapItem(loc, lastmod, attrs['changefreq'], attrs['priority'])
-            prepared.append(item)
+            for row, lastmod in zip(rows, lastmods):
+                loc = helpers.join_url_path(self.url, prefix, str(row[0]), suffix)
+                # lastmod formatted here is valid, the others are checked once
+                lastmod = next(formatted) if isinstance(lastmod, datetime) else LastModified.validate(lastmod)
+                pairs.append((loc, lastmod))
 
-        logger.debug(f'Included {len(prepared)} items')
-        return prepared
+            yield SitemapItem.bulk(pairs, changefreq, priority, check_lastmod=False)
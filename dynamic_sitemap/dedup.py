@@ -0,0 +1,125 @@
+"""Deduplication of items by location without keeping sets of items.
+
+A set of locations is exact, BloomFilter takes a few bytes per location at the cost of false positives:
+a new location may be considered seen with the given probability.
+"""
+import hashlib
+import math
+from typing import Iterable, Iterator, List, Set, TypeVar, Union  # noqa: F401
+
+from .exceptions import SitemapValidationError
+from .items import SitemapItemBase
+
+
+Item = TypeVar('Item', bound=SitemapItemBase)
+
+
+class BloomFilter:
+    """A probabilistic set of locations growing as they are added.
+    When it is full, a new slice twice as big with a tighter error rate is added,
+    so the total error rate stays within the given one.
+
+    :param capacity: an expected number of locations
+    :param error_rate: a probability to consider a new location seen
+    """
+    #: float, a ratio of error rates of consecutive slices
+    tightening: float = 0.5
+
+    def __init__(self, capacity: int = 1_000_000, error_rate: float = 0.001):
+        if not (isinstance(capacity, int) and capacity > 0):
+            raise SitemapValidationError('Capacity should be an integer greater than 0')
+        if not (isinstance(error_rate, float) and 0.0 < error_rate < 1.0):
+            raise SitemapValidationError('Error rate should be a float between 0.0 and 1.0')
+
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._slices = []    # type: List[_Slice]
+        self._count = 0
+        self._add_slice(capacity, error_rate * (1 - self.tightening))
+
+    def add(self, loc: str) -> bool:
+        """Add a location.
+
+        :returns whether the location has not been seen before, False may be a false positive
+        """
+        first, second = _hash(loc)
+
+        if any(piece.contains(first, second) for piece in self._slices):
+            return False
+
+        last = self._slices[-1]
+        if last.count >= last.capacity:
+            last = self._add_slice(last.capacity * 2, last.error_rate * self.tightening)
+
+        last.add(first, second)
+        self._count += 1
+        return True
+
+    def __contains__(self, loc: str) -> bool:
+        first, second = _hash(loc)
+        return any(piece.contains(first, second) for piece in self._slices)
+
+    def __len__(self) -> int:
+        """A number of added locations."""
+        return self._count
+
+    @property
+    def size(self) -> int:
+        """Bytes taken by bits."""
+        return sum(len(piece.bits) for piece in self._slices)
+
+    def _add_slice(self, capacity: int, error_rate: float) -> '_Slice':
+        self._slices.append(_Slice(capacity, error_rate))
+        return self._slices[-1]
+
+
+class _Slice:
+    """Bits of a Bloom filter of a fixed capacity."""
+    __slots__ = ('capacity', 'error_rate', 'bits', 'size', 'hashes', 'count')
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def add(self, first: int, second: int):
+        bits, size = self.bits, self.size
+        for i in range(self.hashes):
+            index = (first + i * second) % size
+            bits[index >> 3] |= 1 << (index & 7)
+        self.count += 1
+
+    def contains(self, first: int, second: int) -> bool:
+        bits, size = self.bits, self.size
+        for i in range(self.hashes):
+            index = (first + i * second) % size
+            if not bits[index >> 3] & (1 << (index & 7)):
+                return False
+        return True
+
+
+def _hash(loc: str) -> tuple:
+    """Get two 64-bit hashes of a location to derive indexes of bits from."""
+    digest = hashlib.blake2b(loc.encode(), digest_size=16).digest()
+    return int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+
+
+def unique(items: Iterable[Item], seen: Union[Set[str], BloomFilter] = None) -> Iterator[Item]:
+    """Yield items with locations which have not been seen before, so the first item of a location is kept.
+
+    :param items: items to deduplicate
+    :param seen: a set of locations or a BloomFilter, a new set is used if None
+    """
+    if isinstance(seen, BloomFilter):
+        add = seen.add
+        yield from (item for item in items if add(item.loc))
+        return
+
+    seen = set() if seen is None else seen
+    for item in items:
+        if item.loc not in seen:
+            seen.add(item.loc)
+            yield item
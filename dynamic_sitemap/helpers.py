@@ -1,12 +1,15 @@
+from bisect import bisect_right
 from collections import namedtuple
-from datetime import datetime
+from datetime import datetime, timezone
+from functools import lru_cache
+from itertools import islice
+from operator import attrgetter
 from typing import (
-    Callable, Collection, Iterable, Iterator, Optional, Set, Tuple, Type,
+    Any, Callable, Collection, Dict, Iterable, Iterator, List, Optional,
+    Sequence, Set, Tuple, Type,
 )
 from urllib.parse import urljoin, urlparse
 
-from pytz import timezone
-
 from .exceptions import SitemapItemError, SitemapValidationError
 from .items import SitemapItemBase
 
@@ -21,6 +24,98 @@ _QUERIES = {
     'local': lambda model: model.all(),
 }
 
+#: int, a number of rows loaded from a database at once by fetchers
+CHUNK_SIZE = 2000
+
+Fetcher = Callable[..., Iterable[tuple]]
+PageGetter = Callable[[Any, int], Iterable[tuple]]
+
+
+def paginate(get_page: PageGetter, batch_size: int) -> Iterator[tuple]:
+    """Walk through a table by keyset pagination: WHERE key > last ORDER BY key LIMIT batch_size.
+
+    :param get_page: a function returning rows following a key (None for the first page) ordered by key,
+                     a key is the first value of a row
+    :param batch_size: a number of rows in a page
+    :returns rows without keys
+    """
+    after = None
+
+    while True:
+        page = list(get_page(after, batch_size))
+
+        for row in page:
+            yield row[1:]
+
+        if len(page) < batch_size:
+            return
+        after = page[-1][0]
+
+
+def _fetch_django(model, fields: Sequence[str], batch_size: int = 0) -> Iterable[tuple]:
+    if not batch_size:
+        return model.objects.values_list(*fields).iterator(chunk_size=CHUNK_SIZE)
+
+    key = model._meta.pk.name
+    queryset = model.objects.order_by(key).values_list(key, *fields)
+
+    def get_page(after, limit):
+        page = queryset if after is None else queryset.filter(**{f'{key}__gt': after})
+        return page[:limit]
+
+    return paginate(get_page, batch_size)
+
+
+def _fetch_peewee(model, fields: Sequence[str], batch_size: int = 0) -> Iterable[tuple]:
+    columns = [getattr(model, field) for field in fields]
+    if not batch_size:
+        return model.select(*columns).tuples().iterator()
+
+    key = model._meta.primary_key
+
+    def get_page(after, limit):
+        query = model.select(key, *columns)
+        if after is not None:
+            query = query.where(key > after)
+        return query.order_by(key).limit(limit).tuples()
+
+    return paginate(get_page, batch_size)
+
+
+def _fetch_sqlalchemy(model, fields: Sequence[str], batch_size: int = 0) -> Iterable[tuple]:
+    columns = [getattr(model, field) for field in fields]
+    if not batch_size:
+        return model.query.with_entities(*columns).yield_per(CHUNK_SIZE)
+
+    key = model.__mapper__.primary_key[0]
+
+    def get_page(after, limit):
+        query = model.query.with_entities(key, *columns)
+        if after is not None:
+            query = query.filter(key > after)
+        return query.order_by(key).limit(limit)
+
+    return paginate(get_page, batch_size)
+
+
+def _fetch_local(model, fields: Sequence[str], batch_size: int = 0) -> Iterable[tuple]:
+    get = attrgetter(*fields) if len(fields) > 1 else lambda record: (getattr(record, fields[0]),)
+    if not batch_size:
+        return map(get, model.all())
+
+    def get_page(after, limit):
+        return ((key, *get(record)) for key, record in model.page(after, limit))
+
+    return paginate(get_page, batch_size)
+
+
+_FETCHERS = {
+    'django': _fetch_django,
+    'peewee': _fetch_peewee,
+    'sqlalchemy': _fetch_sqlalchemy,
+    'local': _fetch_local,
+}   # type: Dict[str, Fetcher]
+
 
 class ORMModel:
     """Just the mock representing models of different ORMs."""
@@ -34,6 +129,10 @@ class Model(ORMModel):
     Used with ``add_raw_rule``.
 
     :param extractor: a function that fetches loc & lastmod from a database.
+        To be used with a batch size, it should accept ``after`` and ``limit`` keyword arguments
+        and return at most ``limit`` rows ordered by a key and following the ``after`` key
+        (None for the first page). A row is (slug, lastmod) where slug is the key
+        or (slug, lastmod, key).
     """
 
     slug = lastmod = True
@@ -44,6 +143,11 @@ class Model(ORMModel):
     def all(self) -> Iterator[_Row]:     # noqa: A003
         return (_Row(slug=i[0], lastmod=i[1]) for i in self.extract())
 
+    def page(self, after: Any, limit: int) -> Iterator[Tuple[Any, _Row]]:
+        """Get rows following the ``after`` key with their keys."""
+        for i in self.extract(after=after, limit=limit):
+            yield (i[2] if len(i) > 2 else i[0]), _Row(slug=i[0], lastmod=i[1])
+
 
 def check_url(url: str) -> str:
     """Check URL correct."""
@@ -71,24 +175,138 @@ def join_url_path(base_url: str, *path: str) -> str:
     return url
 
 
+class PrefixMatcher:
+    """Checks whether strings start with any of prefixes walking a trie of them once per string."""
+    __slots__ = ('_root',)
+
+    def __init__(self, prefixes: Iterable[str]):
+        self._root = {}    # type: Dict[Optional[str], dict]
+
+        for prefix in prefixes:
+            node = self._root
+            for char in prefix:
+                node = node.setdefault(char, {})
+            node[None] = {}
+
+    def match(self, string: str) -> bool:
+        node = self._root
+
+        for char in string:
+            if None in node:
+                return True
+            node = node.get(char)    # type: ignore
+            if node is None:
+                return False
+
+        return None in node
+
+
+class DatetimeFormatter:
+    """Formats datetimes according to W3C datetime format in a time zone.
+
+    The time zone is resolved once. Its transitions are converted to timestamps,
+    so a UTC offset is found by bisection and the conversion is done by datetime's C code
+    instead of pytz.
+
+    :param tz: one of pytz.all_timezones; if None, datetimes are formatted as they are
+    """
+
+    def __init__(self, tz: str = None):
+        self.tz = tz
+        self._transitions = []            # type: List[float]
+        self._zones = []                  # type: List[timezone]
+
+        if tz is None:
+            return
+
+        import pytz
+
+        zone = pytz.timezone(tz)
+        transitions = getattr(zone, '_utc_transition_times', None)
+
+        if transitions is None:
+            self._zones.append(timezone(zone.utcoffset(None)))    # type: ignore
+            return
+
+        epoch = datetime(1970, 1, 1)
+        self._transitions = [(moment - epoch).total_seconds() for moment in transitions]
+        offsets = {}                      # type: Dict[Any, timezone]
+        infos = zone._transition_info     # type: ignore
+        self._zones = [offsets.setdefault(info[0], timezone(info[0])) for info in infos]
+
+    def __call__(self, dt: datetime) -> str:
+        """Format a datetime. A naive one is considered as the local time if the time zone is set."""
+        return self.format_many((dt,))[0]
+
+    def format_many(self, values: Iterable[datetime]) -> List[str]:
+        """Format a batch of datetimes."""
+        if not self._zones:
+            return [dt.isoformat(timespec='seconds') for dt in values]
+
+        from_timestamp = datetime.fromtimestamp
+
+        if not self._transitions:
+            zone = self._zones[0]
+            return [from_timestamp(dt.timestamp(), zone).isoformat(timespec='seconds') for dt in values]
+
+        transitions, zones = self._transitions, self._zones
+        result = []
+
+        for dt in values:
+            timestamp = dt.timestamp()
+            zone = zones[bisect_right(transitions, timestamp) - 1]
+            result.append(from_timestamp(timestamp, zone).isoformat(timespec='seconds'))
+
+        return result
+
+
+@lru_cache(maxsize=None)
+def get_datetime_formatter(tz: str = None) -> DatetimeFormatter:
+    """Return a formatter of the time zone created once per process."""
+    return DatetimeFormatter(tz)
+
+
 def get_iso_datetime(dt: datetime, tz: str = None) -> str:
     """Return the time with a timezone formatted according to W3C datetime format."""
-    if tz is None:
-        return dt.isoformat(timespec='seconds')
+    return get_datetime_formatter(tz)(dt)
+
 
-    zone = timezone(tz)    # type: ignore
-    return dt.astimezone(zone).isoformat(timespec='seconds')
+def chunked(iterable: Iterable, size: int) -> Iterator[list]:
+    """Split an iterable into lists of the given size."""
+    iterator = iter(iterable)
+
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
 
 
 def get_query(orm_name: str = None) -> Callable:
     """Return ORM query which evaluation returning Records."""
+    return _get_orm_function(_QUERIES, orm_name)
+
+
+def get_fetcher(orm_name: str = None) -> Fetcher:
+    """Return a function streaming tuples of the given model fields only.
+    With a batch size passed, the function walks a table by primary key pages.
+
+    Example:
+        >>> fetch = get_fetcher('sqlalchemy')
+        >>> for slug, updated in fetch(Post, ['slug', 'updated'], batch_size=1000):
+        ...     print(slug, updated)
+    """
+    return _get_orm_function(_FETCHERS, orm_name)
+
+
+def _get_orm_function(functions: Dict[str, Callable], orm_name: Optional[str]) -> Callable:
     if orm_name is None:
-        return _QUERIES['local']
+        return functions['local']
 
     if isinstance(orm_name, str):
         orm = orm_name.casefold()
-        if orm in _QUERIES:
-            return _QUERIES[orm]
+        if orm in functions:
+            return functions[orm]
 
         raise SitemapValidationError('ORM is not supported yet: ' + orm_name)
     raise SitemapValidationError('"orm" argument should be str or None')
@@ -111,8 +329,11 @@ def get_items(raw_data: Collection,
         else:
             raise SitemapItemError('Bad item', item)
 
-        data.setdefault('changefreq', default_changefreq)
-        data.setdefault('priority', default_priority)
+        if default_changefreq is not None:
+            data.setdefault('changefreq', default_changefreq)
+
+        if default_priority is not None:
+            data.setdefault('priority', default_priority)
 
         if base_url:
             data['loc'] = urljoin(base_url, data['loc'])
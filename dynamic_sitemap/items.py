@@ -1,11 +1,24 @@
-from typing import Optional
+from typing import Dict, Iterable, List, Optional, Tuple
 from xml.etree import ElementTree
 
 from .validators import ChangeFrequency, LastModified, Location, Priority
 
 
+def escape(data: str, entities: Dict[str, str] = None) -> str:
+    """Escape '&', '<', '>' and the given entities of a string.
+    The same as xml.sax.saxutils.escape, which imports urllib.request along.
+    """
+    data = data.replace('&', '&amp;').replace('>', '&gt;').replace('<', '&lt;')
+    for char, entity in (entities or {}).items():
+        data = data.replace(char, entity)
+    return data
+
+
 class SitemapItemBase:
     """Thr base class for sitemap and sitemap index items."""
+    __slots__ = ('_loc', '_lastmod')
+    _loc: Optional[str]
+    _lastmod: Optional[str]
     loc = Location()
     lastmod = LastModified()
 
@@ -28,9 +41,14 @@ class SitemapItemBase:
         """Get an XML representation."""
         raise NotImplementedError
 
+    def as_string(self) -> str:
+        """Get a serialized XML representation without building an element."""
+        raise NotImplementedError
+
 
 class SitemapIndexItem(SitemapItemBase):
     """The class representing an item of a sitemap index."""
+    __slots__ = ()
 
     def as_xml(self):
         """Get an XML representation."""
@@ -42,9 +60,21 @@ class SitemapIndexItem(SitemapItemBase):
 
         return element
 
+    def as_string(self) -> str:
+        """Get a serialized XML representation without building an element."""
+        result = '<sitemap><loc>' + escape(self.loc) + '</loc>'
+
+        if self.lastmod:
+            result += '<lastmod>' + escape(self.lastmod) + '</lastmod>'
+
+        return result + '</sitemap>'
+
 
 class SitemapItem(SitemapItemBase):
     """The class representing an item of a sitemap."""
+    __slots__ = ('_changefreq', '_priority')
+    _changefreq: Optional[str]
+    _priority: Optional[float]
     changefreq = ChangeFrequency()
     priority = Priority()
 
@@ -56,6 +86,56 @@ class SitemapItem(SitemapItemBase):
         self.changefreq = changefreq
         self.priority = priority
 
+    @classmethod
+    def from_validated(cls,
+                       loc: str,
+                       lastmod: Optional[str] = None,
+                       changefreq: Optional[str] = None,
+                       priority: Optional[float] = None) -> 'SitemapItem':
+        """Create an item from values which have already been validated, skipping validation."""
+        item = cls.__new__(cls)
+        item._loc = loc
+        item._lastmod = lastmod
+        item._changefreq = changefreq
+        item._priority = priority
+        return item
+
+    @classmethod
+    def bulk(cls,
+             rows: Iterable[Tuple[str, Optional[str]]],
+             changefreq: Optional[str] = None,
+             priority: Optional[float] = None,
+             check_lastmod: bool = True) -> List['SitemapItem']:
+        """Create items sharing change frequency and priority.
+        The shared values are validated once. The first loc is validated completely,
+        the rest are only checked to be non-empty strings.
+
+        :param rows: pairs of loc and lastmod
+        :param changefreq: a change frequency of all the items
+        :param priority: a priority of all the items
+        :param check_lastmod: whether to validate lastmod values, disable for the values formatted by the package
+        """
+        changefreq = ChangeFrequency.validate(changefreq)
+        priority = Priority.validate(priority)
+        validate_lastmod = LastModified.validate
+        new = cls.__new__
+        items = []    # type: List[SitemapItem]
+
+        for loc, lastmod in rows:
+            if not items or type(loc) is not str or not loc:
+                Location.validate(loc)
+            if check_lastmod and lastmod is not None:
+                validate_lastmod(lastmod)
+
+            item = new(cls)
+            item._loc = loc
+            item._lastmod = lastmod
+            item._changefreq = changefreq
+            item._priority = priority
+            items.append(item)
+
+        return items
+
     def as_xml(self):
         """Get an XML representation."""
         element = ElementTree.Element('url')
@@ -71,3 +151,18 @@ class SitemapItem(SitemapItemBase):
             ElementTree.SubElement(element, 'priority').text = str(self.priority)
 
         return element
+
+    def as_string(self) -> str:
+        """Get a serialized XML representation without building an element."""
+        result = '<url><loc>' + escape(self.loc) + '</loc>'
+
+        if self.lastmod:
+            result += '<lastmod>' + escape(self.lastmod) + '</lastmod>'
+
+        if self.changefreq:
+            result += '<changefreq>' + escape(self.changefreq) + '</changefreq>'
+
+        if self.priority:
+            result += '<priority>' + str(self.priority) + '</priority>'
+
+        return result + '</url>'
@@ -0,0 +1,67 @@
+import os
+from typing import Optional  # noqa: F401
+
+
+try:
+    import fcntl
+except ImportError:    # pragma: no cover
+    fcntl = None       # type: ignore
+    import msvcrt
+
+
+class FileLock:
+    """An advisory lock shared by processes through a lock file.
+
+    :param filename: a path to the lock file, it is created if needed
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self._fd = None    # type: Optional[int]
+
+    @property
+    def locked(self) -> bool:
+        return self._fd is not None
+
+    def acquire(self, blocking: bool = True) -> bool:
+        """Acquire the lock.
+
+        :param blocking: whether to wait for the lock released by another process
+        :returns whether the lock is acquired
+        """
+        fd = os.open(self.filename, os.O_RDWR | os.O_CREAT, 0o644)
+
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:    # pragma: no cover
+                msvcrt.locking(fd, msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+        except OSError:
+            os.close(fd)
+            if blocking:
+                raise
+            return False
+
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is None:
+            return
+
+        fd, self._fd = self._fd, None
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:    # pragma: no cover
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(fd)
+
+    def __enter__(self) -> 'FileLock':
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
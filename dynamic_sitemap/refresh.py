@@ -0,0 +1,63 @@
+import logging
+import threading
+from typing import Callable, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+class Refresher:
+    """Calls a refresh function in a background thread when woken up or periodically.
+
+    :param refresh: a function to call
+    :param interval: seconds between periodical calls; if None, calls only when woken up
+    """
+
+    def __init__(self, refresh: Callable[[], None], interval: Optional[float] = None):
+        self.refresh = refresh
+        self.interval = interval
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None               # type: Optional[threading.Thread]
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start a background thread if it is not running."""
+        if self.running:
+            return
+
+        self._stopped.clear()
+        self._wakeup.clear()
+        self._thread = threading.Thread(target=self._run, name='sitemap-refresher', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop a background thread waiting for the current refresh to finish.
+
+        :param timeout: seconds to wait for
+        """
+        self._stopped.set()
+        self._wakeup.set()
+
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def wake(self):
+        """Ask for a refresh. Does nothing if a refresh is already requested."""
+        self._wakeup.set()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.interval)
+            if self._stopped.is_set():
+                return
+
+            self._wakeup.clear()
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception('Background sitemap refresh failed')
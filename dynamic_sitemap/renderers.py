@@ -1,10 +1,193 @@
+import gzip
+import hashlib
+import os
+import tempfile
+from bisect import bisect_left
+from collections import namedtuple
+from heapq import merge
 from io import BytesIO
 from operator import attrgetter
-from typing import Collection
+from typing import (  # noqa: F401
+    Any, BinaryIO, Callable, Collection, Dict, Iterable, Iterator, List,
+    Optional, Sequence, Set, Tuple,
+)
 from xml.etree import ElementTree
 
 from .exceptions import SitemapValidationError
-from .items import SitemapIndexItem, SitemapItem, SitemapItemBase
+from .items import SitemapIndexItem, SitemapItem, SitemapItemBase, escape
+
+
+_ATTR_ENTITIES = {'"': '&quot;', '\r': '&#13;', '\n': '&#10;', '\t': '&#09;'}
+#: int, a compression level used for gzipped output
+COMPRESS_LEVEL = 6
+#: possible orders of items: as they are stored, by location or by last modification and location
+ORDERS = ('none', 'loc', 'lastmod')
+#: a written shard: a path, the first and the last locations, a number of items,
+#: a hash of the uncompressed content and whether the file is rewritten
+Shard = namedtuple('Shard', 'filename first last count digest changed')
+
+
+def merge_unique(streams: Sequence[Iterable[SitemapItemBase]]) -> Iterator[SitemapItemBase]:
+    """Merge streams of items ordered by location lazily.
+    Of items with the same location the one from the earlier stream is kept.
+    """
+    previous = None
+
+    for item in merge(*streams, key=attrgetter('loc')):
+        if item.loc != previous:
+            previous = item.loc
+            yield item
+
+
+def _lastmod_key(item: SitemapItemBase) -> tuple:
+    return item.lastmod or '', item.loc
+
+
+def open_file(filename: str, compress: Optional[bool] = None) -> BinaryIO:
+    """Open a file for writing. Files with '.gz' extension are compressed while being written.
+
+    :param filename: a path to a file
+    :param compress: whether to compress the file regardless of its extension
+    """
+    if compress is None:
+        compress = filename.endswith('.gz')
+    if compress:
+        return gzip.open(filename, 'wb', compresslevel=COMPRESS_LEVEL)    # type: ignore
+    return open(filename, 'wb')
+
+
+class AtomicFile:
+    """A file written to a temporary path and moved to the target one on commit,
+    so readers get either the previous file or the complete new one.
+
+    :param filename: a path to publish the file at, files with '.gz' extension are compressed
+    """
+    #: int, permissions of published files
+    mode = 0o644
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        directory, name = os.path.split(os.path.abspath(filename))
+        fd, self.temp_name = tempfile.mkstemp(prefix=f'.{name}.', suffix='.tmp', dir=directory)
+        os.close(fd)
+        self._file = open_file(self.temp_name, filename.endswith('.gz'))
+
+    def write(self, data: bytes) -> int:
+        return self._file.write(data)
+
+    def commit(self):
+        """Close the file and publish it replacing the previous one."""
+        self._file.close()
+        os.chmod(self.temp_name, self.mode)
+        os.replace(self.temp_name, self.filename)
+
+    def discard(self):
+        """Close the file and remove it leaving the previous one."""
+        self._file.close()
+        if os.path.exists(self.temp_name):
+            os.remove(self.temp_name)
+
+    def __enter__(self) -> 'AtomicFile':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.discard()
+
+
+class ShardFile(AtomicFile):
+    """An atomic file hashing its content. If the content is the same as the previous one has,
+    the previous file is kept untouched on commit.
+
+    :param filename: a path to publish the file at
+    :param digest: a hash of the previous file content
+    """
+
+    def __init__(self, filename: str, digest: Optional[str] = None):
+        super().__init__(filename)
+        self.previous = digest
+        self.changed = False
+        self._hash = hashlib.sha256()
+
+    @property
+    def digest(self) -> str:
+        return self._hash.hexdigest()
+
+    def write(self, data: bytes) -> int:
+        self._hash.update(data)
+        return super().write(data)
+
+    def commit(self):
+        if self.digest == self.previous and os.path.exists(self.filename):
+            self.discard()
+            return
+
+        super().commit()
+        self.changed = True
+
+
+class ShardBounds:
+    """Boundaries of shards written before. A shard is cut after the last location of a previous one,
+    so an added or removed item changes only the shard of its range, and the others keep their names.
+    Shards of an overflowing range are split, the new ones are named with numbers not taken yet.
+
+    :param get_filename: a function returning a filename by a shard number starting with 1
+    :param lasts: the last locations of the previous shards by their filenames in order of locations
+    """
+
+    def __init__(self, get_filename: Callable[[int], str], lasts: Dict[str, str] = None):
+        lasts = lasts or {}
+        if list(lasts.values()) != sorted(lasts.values()):
+            lasts = {}
+
+        self.get_new_filename = get_filename
+        # items after the last location go to the last shard
+        self._lasts = list(lasts.values())[:-1]
+        self._names = list(lasts)
+        self._taken = set()     # type: Set[str]
+        self._number = 0
+
+    def is_crossed(self, previous: str, loc: str) -> bool:
+        """Check whether a boundary lies between two successive locations."""
+        index = bisect_left(self._lasts, previous)
+        return index < len(self._lasts) and loc > self._lasts[index]
+
+    def get_filename(self, first: str) -> str:
+        """Get a filename of a shard by its first location: the name of the previous shard of its range
+        or a new one if it is taken by another part of the range.
+        """
+        index = bisect_left(self._lasts, first)
+        filename = self._names[index] if index < len(self._names) else None
+
+        while filename is None or filename in self._taken:
+            self._number += 1
+            filename = self.get_new_filename(self._number)
+            if filename in self._names:
+                filename = None
+
+        self._taken.add(filename)
+        return filename
+
+    def split(self, items: Iterable[Any], max_items: int, key: Callable[[Any], str]) -> Iterator[Tuple[str, list]]:
+        """Split ordered items into chunks of shards.
+
+        :param items: items ordered by location
+        :param max_items: a maximum number of items in a shard
+        :param key: a function returning a location of an item
+        :returns filenames and items of shards
+        """
+        chunk = []    # type: List[Any]
+
+        for item in items:
+            if chunk and (len(chunk) >= max_items or self.is_crossed(key(chunk[-1]), key(item))):
+                yield self.get_filename(key(chunk[0])), chunk
+                chunk = []
+            chunk.append(item)
+
+        if chunk:
+            yield self.get_filename(key(chunk[0])), chunk
 
 
 class RendererBase:
@@ -21,35 +204,172 @@ class RendererBase:
         """Write to a file."""
         raise NotImplementedError
 
+    def stream(self, file: BinaryIO):
+        """Write to a file-like object chunk by chunk."""
+        for chunk in self.iter_bytes():
+            file.write(chunk)
+
+    def iter_bytes(self) -> Iterator[bytes]:
+        """Yield an encoded representation chunk by chunk."""
+        raise NotImplementedError
+
     @property
     def items(self) -> Collection[SitemapItemBase]:
         return self._items
 
 
 class XMLRendererBase(RendererBase):
-    """The base class for XML renderers."""
+    """The base class for XML renderers.
+
+    Items are serialized one by one straight into the output,
+    so the whole element tree is never held in memory.
+    The output is the same as ``ElementTree.write`` produces.
+
+    :param items: items to render
+    :param order: one of ORDERS
+    :param streams: lists of the same items ordered by location to merge instead of sorting
+    """
     set_name: str
     set_attrs: dict
+    #: int, a minimal size of a chunk yielded by iter_bytes
+    chunk_size: int = 64 * 1024
+    declaration: str = "<?xml version='1.0' encoding='UTF-8'?>\n"
+    encoding: str = 'UTF-8'
+
+    def __init__(self,
+                 items: Collection[SitemapItemBase],
+                 order: str = 'loc',
+                 streams: Optional[Sequence[Iterable[SitemapItemBase]]] = None):
+        super().__init__(items)
+        if order not in ORDERS:
+            raise SitemapValidationError('Order should be one of the following: ' + ', '.join(ORDERS))
+        self.order = order
+        self.streams = streams
 
     def render(self) -> str:
         """Render a sitemap."""
         io = BytesIO()
-        tree = self.get_tree()
-        tree.write(io, xml_declaration=True, encoding='UTF-8')
-        return io.getvalue().decode()
+        self.stream(io)
+        return io.getvalue().decode(self.encoding)
 
     def write(self, filename: str):
-        """Write a sitemap to a file."""
+        """Write a sitemap to a file. The file is replaced atomically when it is completely written."""
         if filename is None:
             raise SitemapValidationError('Filename is not provided.')
 
-        tree = self.get_tree()
-        tree.write(filename, xml_declaration=True, encoding='UTF-8')
+        with AtomicFile(filename) as file:
+            self.stream(file)    # type: ignore
+
+    def iter_bytes(self) -> Iterator[bytes]:
+        """Yield a sitemap as encoded chunks of at least chunk_size bytes."""
+        items = iter(self.get_ordered())
+        first = next(items, None)
+
+        if first is None:
+            yield (self.declaration + self.get_start_tag(closed=True)).encode(self.encoding)
+            return
+
+        buffer = [self.declaration, self.get_start_tag(), first.as_string()]
+        size = sum(map(len, buffer))
+
+        for item in items:
+            string = item.as_string()
+            buffer.append(string)
+            size += len(string)
+
+            if size >= self.chunk_size:
+                yield ''.join(buffer).encode(self.encoding)
+                buffer.clear()
+                size = 0
+
+        buffer.append(self.get_end_tag())
+        yield ''.join(buffer).encode(self.encoding)
+
+    def iter_shards(self,
+                    get_filename: Callable[[int], str],
+                    max_items: int,
+                    max_size: int,
+                    digests: Dict[str, str] = None,
+                    lasts: Dict[str, str] = None) -> Iterator[Shard]:
+        """Write a sitemap split into several files each within the given limits.
+        A file is published atomically as soon as it is filled, so only one of them is open at a time.
+
+        :param get_filename: a function returning a filename by a shard number starting with 1
+        :param max_items: a maximum number of items in a file
+        :param max_size: a maximum uncompressed size of a file in bytes
+        :param digests: hashes of the previous files by their names, files with the same content are not rewritten
+        :param lasts: the last locations of the previous files by their names to cut files at, see ShardBounds
+        :returns shards as they are written
+        """
+        head = (self.declaration + self.get_start_tag()).encode(self.encoding)
+        tail = self.get_end_tag().encode(self.encoding)
+        digests = digests or {}
+        bounds = ShardBounds(get_filename, lasts)
+        file = None       # type: Optional[ShardFile]
+        first = last = ''
+        count = size = 0
+
+        try:
+            for item in self.get_ordered():
+                data = item.as_string().encode(self.encoding)
+
+                full = count >= max_items or size + len(data) + len(tail) > max_size
+                if file is None or full or bounds.is_crossed(last, item.loc):
+                    if file is not None:
+                        file.write(tail)
+                        file.commit()
+                        yield Shard(file.filename, first, last, count, file.digest, file.changed)
+                        file = None
+
+                    filename = bounds.get_filename(item.loc)
+                    file = ShardFile(filename, digests.get(filename))
+                    file.write(head)
+                    first, count, size = item.loc, 0, len(head)
+
+                    if size + len(data) + len(tail) > max_size:
+                        raise SitemapValidationError(f'An item does not fit into {max_size} bytes: {item}')
+
+                file.write(data)
+                last = item.loc
+                count += 1
+                size += len(data)
+
+            if file is not None:
+                file.write(tail)
+                file.commit()
+                yield Shard(file.filename, first, last, count, file.digest, file.changed)
+                file = None
+        finally:
+            if file is not None:
+                file.discard()
+
+    def get_ordered(self) -> Iterable[SitemapItemBase]:
+        """Get items in the order they should be rendered."""
+        if self.order == 'none':
+            return self.items
+
+        if self.order == 'lastmod':
+            return sorted(self.items, key=_lastmod_key)
+
+        if self.streams is not None:
+            return merge_unique(self.streams)
+
+        return sorted(self.items, key=attrgetter('loc'))
+
+    def get_start_tag(self, closed: bool = False) -> str:
+        attrs = ''.join(
+            f' {name}="{escape(value, _ATTR_ENTITIES)}"' for name, value in self.set_attrs.items()
+        )
+        end = ' />' if closed else '>'
+        return f'<{self.set_name}{attrs}{end}'
+
+    def get_end_tag(self) -> str:
+        return f'</{self.set_name}>'
 
     def get_tree(self) -> ElementTree.ElementTree:
         url_set = self.get_set()
 
-        for item in sorted(self.items, key=attrgetter('loc')):
+        for item in self.get_ordered():
             url_set.append(item.as_xml())
 
         return ElementTree.ElementTree(url_set)
@@ -64,8 +384,11 @@ class SitemapIndexXMLRenderer(XMLRendererBase):
         'xmlns': 'http://www.sitemaps.org/schemas/sitemap/0.9',
     }
 
-    def __init__(self, items: Collection[SitemapIndexItem]):
-        super().__init__(items)
+    def __init__(self,
+                 items: Collection[SitemapIndexItem],
+                 order: str = 'loc',
+                 streams: Optional[Sequence[Iterable[SitemapIndexItem]]] = None):
+        super().__init__(items, order, streams)
 
 
 class SitemapXMLRenderer(XMLRendererBase):
@@ -78,5 +401,8 @@ class SitemapXMLRenderer(XMLRendererBase):
             'http://www.sitemaps.org/schemas/sitemap/0.9/sitemap.xsd',
     }
 
-    def __init__(self, items: Collection[SitemapItem]):
-        super().__init__(items)
+    def __init__(self,
+                 items: Collection[SitemapItem],
+                 order: str = 'loc',
+                 streams: Optional[Sequence[Iterable[SitemapItem]]] = None):
+        super().__init__(items, order, streams)
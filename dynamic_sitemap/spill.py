@@ -0,0 +1,185 @@
+"""Sorting of items out of core, so a size of a written sitemap is bounded by disk rather than memory.
+
+Example:
+
+    with ExternalSorter(max_items=1_000_000) as sorter:
+        sorter.add(items)
+        SitemapXMLRenderer(sorter, 'none').write('sitemap.xml')
+"""
+import heapq
+import logging
+import os
+import pickle
+import tempfile
+from itertools import chain
+from operator import attrgetter, itemgetter
+from typing import (  # noqa: F401
+    Iterable, Iterator, List, Optional, Set, Tuple, Union,
+)
+
+from . import helpers
+from .dedup import BloomFilter, unique
+from .exceptions import SitemapValidationError
+from .items import SitemapItem
+
+
+logger = logging.getLogger(__name__)
+Row = Tuple[str, Optional[str], Optional[str], Optional[float]]
+get_row = attrgetter('loc', 'lastmod', 'changefreq', 'priority')
+get_loc = itemgetter(0)
+
+
+class ExternalSorter:
+    """A collection of items ordered by location and unique by it.
+
+    Items are kept in memory until there are max_items of them, then they are sorted
+    and written to a temporary file as a run. Iteration merges the runs, so only a block
+    of every run is in memory at a time. Of items with the same location the first added one is kept.
+
+    If a set of seen locations is given, items are deduplicated by it as they are added
+    and kept in that order instead of being sorted.
+
+    Items ordered by the last modification and location are sorted again out of core:
+    the unique items are written to runs of max_items sorted by that key once, and then these runs are merged.
+
+    :param max_items: a number of items kept in memory
+    :param directory: a directory for temporary files, the system one is used if None
+    :param seen: a set of locations or a BloomFilter
+    :param by_lastmod: whether items are ordered by the last modification and location
+    """
+
+    def __init__(self,
+                 max_items: int,
+                 directory: Optional[str] = None,
+                 seen: Optional[Union[Set[str], BloomFilter]] = None,
+                 by_lastmod: bool = False):
+        if not (isinstance(max_items, int) and max_items > 0):
+            raise SitemapValidationError('Max items should be an integer greater than 0')
+        self.max_items = max_items
+        self.directory = directory
+        self.seen = seen
+        self.by_lastmod = by_lastmod
+        self.runs = []           # type: List[str]
+        self.sorted_runs = []    # type: List[str]
+        self._buffer = []        # type: List[Row]
+        self._count = 0
+        self._merged = None      # type: Optional[int]
+
+    def add(self, items: Iterable[SitemapItem]):
+        """Add items spilling them to disk when the buffer is full."""
+        if self.seen is not None:
+            items = unique(items, self.seen)
+
+        self._drop_sorted()
+        for item in items:
+            self._buffer.append(get_row(item))
+            if len(self._buffer) >= self.max_items:
+                self._spill()
+
+    def close(self):
+        """Remove temporary files."""
+        self._drop_sorted()
+        _remove(self.runs)
+        self._buffer.clear()
+        self._count = 0
+
+    def __len__(self) -> int:
+        """A number of unique items. Runs sorted by location are merged once to count
+        items with the same location in different runs as one.
+        """
+        if self.seen is not None:
+            return self._count + len(self._buffer)
+
+        if self._merged is None:
+            self._merged = sum(1 for _ in self._iter_rows())
+        return self._merged
+
+    def __iter__(self) -> Iterator[SitemapItem]:
+        for row in self._iter_rows():
+            yield SitemapItem.from_validated(*row)
+
+    def __enter__(self) -> 'ExternalSorter':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _iter_rows(self) -> Iterator[Row]:
+        if not self.by_lastmod:
+            return self._iter_unique()
+
+        if not self.sorted_runs:
+            for block in helpers.chunked(self._iter_unique(), self.max_items):
+                block.sort(key=_get_lastmod_key)
+                self.sorted_runs.append(self._write_run(block))
+
+        return heapq.merge(*map(_read_run, self.sorted_runs), key=_get_lastmod_key)
+
+    def _iter_unique(self) -> Iterator[Row]:
+        """Iterate unique rows by location, or in the order they are added if they are deduplicated by seen."""
+        if self.seen is not None:
+            return chain(*map(_read_run, self.runs), self._buffer)
+
+        # runs go in the order they are written and the sort is stable, so the first added item wins
+        self._buffer.sort(key=get_loc)
+        streams = [_read_run(filename) for filename in self.runs] + [iter(self._buffer)]
+        return _unique(heapq.merge(*streams, key=get_loc))
+
+    def _spill(self):
+        rows = self._buffer
+
+        if self.seen is None:
+            rows.sort(key=get_loc)
+            rows = list(_unique(rows))
+
+        self.runs.append(self._write_run(rows))
+        self._count += len(rows)
+        self._buffer = []
+
+    def _write_run(self, rows: List[Row]) -> str:
+        fd, filename = tempfile.mkstemp(prefix='sitemap-', suffix='.run', dir=self.directory)
+
+        with os.fdopen(fd, 'wb') as file:
+            for block in helpers.chunked(rows, helpers.CHUNK_SIZE):
+                pickle.dump(block, file, pickle.HIGHEST_PROTOCOL)
+
+        logger.debug('Spilled %d items to %s', len(rows), filename)
+        return filename
+
+    def _drop_sorted(self):
+        """Remove runs sorted by the last modification, they are written again with added items."""
+        _remove(self.sorted_runs)
+        self._merged = None
+
+
+def _get_lastmod_key(row: Row) -> Tuple[str, str]:
+    return row[1] or '', row[0]
+
+
+def _unique(rows: Iterable[Row]) -> Iterator[Row]:
+    """Drop rows with the same location as the previous one has."""
+    previous = None
+
+    for row in rows:
+        if row[0] != previous:
+            yield row
+            previous = row[0]
+
+
+def _read_run(filename: str) -> Iterator[Row]:
+    with open(filename, 'rb') as file:
+        while True:
+            try:
+                block = pickle.load(file)
+            except EOFError:
+                return
+            yield from block
+
+
+def _remove(filenames: List[str]):
+    for filename in filenames:
+        try:
+            os.remove(filename)
+        except FileNotFoundError:
+            pass
+    filenames.clear()
@@ -0,0 +1,126 @@
+import logging
+import threading
+from collections import Counter
+from typing import Callable, Dict, List, Optional  # noqa: F401
+
+
+logger = logging.getLogger(__name__)
+
+#: str, a content type of statistics in Prometheus text format
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class RuleStats:
+    """Statistics of preparing items of a rule. Time is in seconds."""
+    __slots__ = ('rows', 'cached', 'seconds', 'fetch_seconds', 'sort_seconds')
+
+    def __init__(self):
+        self.rows = 0
+        self.cached = False
+        self.seconds = 0.0
+        self.fetch_seconds = 0.0
+        self.sort_seconds = 0.0
+
+    @property
+    def items_seconds(self) -> float:
+        """Time spent on creating items."""
+        return max(self.seconds - self.fetch_seconds - self.sort_seconds, 0.0)
+
+    def __repr__(self):
+        return f'<RuleStats: {self.rows} rows in {self.seconds:.3f} s>'
+
+
+class SitemapStats:
+    """Statistics of building and rendering a sitemap.
+    Values of the last build and render are kept, counters are accumulated since a sitemap is created.
+
+    Callbacks are called with an event name ('build' or 'render') and the statistics.
+    """
+
+    def __init__(self):
+        #: int, a number of data builds
+        self.builds = 0
+        #: int, a number of items built last time
+        self.items = 0
+        #: dict, statistics of rules prepared last time
+        self.rules = {}               # type: Dict[str, RuleStats]
+        #: dict, seconds spent on phases: 'rules', 'dedup', 'render' and 'compress'
+        self.phases = {}              # type: Dict[str, float]
+        #: dict, a size of the last rendered sitemap by a content encoding
+        self.output_bytes = {}        # type: Dict[str, int]
+        #: Counter, cache hits by a cache kind: 'data', 'rule' or 'rendered'
+        self.cache_hits = Counter()   # type: Counter
+        #: Counter, cache misses by a cache kind
+        self.cache_misses = Counter()  # type: Counter
+        self._callbacks = []          # type: List[Callable[[str, SitemapStats], None]]
+        self._lock = threading.Lock()
+
+    def add_callback(self, callback: Callable[[str, 'SitemapStats'], None]):
+        """Register a function called after every build and render."""
+        self._callbacks.append(callback)
+
+    def record_build(self, rules: Dict[str, RuleStats], phases: Dict[str, float], items: int):
+        with self._lock:
+            self.builds += 1
+            self.items = items
+            self.rules = rules
+            self.phases.update(phases)
+        self._notify('build')
+
+    def record_render(self, encoding: Optional[str], seconds: float, size: int):
+        with self._lock:
+            self.phases['compress' if encoding else 'render'] = seconds
+            self.output_bytes[encoding or 'identity'] = size
+        self._notify('render')
+
+    def record_cache(self, kind: str, hit: bool):
+        with self._lock:
+            (self.cache_hits if hit else self.cache_misses)[kind] += 1
+
+    def to_prometheus(self, prefix: str = 'dynamic_sitemap') -> str:
+        """Get statistics in Prometheus text format."""
+        lines = []
+
+        def add(name: str, kind: str, description: str, samples: list):
+            lines.append(f'# HELP {prefix}_{name} {description}')
+            lines.append(f'# TYPE {prefix}_{name} {kind}')
+            for labels, value in samples:
+                text = ','.join(f'{key}="{_escape(str(label))}"' for key, label in labels)
+                lines.append(f'{prefix}_{name}{{{text}}} {value}' if text else f'{prefix}_{name} {value}')
+
+        with self._lock:
+            add('builds_total', 'counter', 'Number of data builds.', [((), self.builds)])
+            add('items', 'gauge', 'Number of items built last time.', [((), self.items)])
+            add('phase_seconds', 'gauge', 'Seconds spent on a phase last time.', [
+                ((('phase', phase),), seconds) for phase, seconds in sorted(self.phases.items())
+            ])
+            add('rule_rows', 'gauge', 'Number of rows fetched for a rule last time.', [
+                ((('rule', rule),), stats.rows) for rule, stats in self.rules.items()
+            ])
+            add('rule_seconds', 'gauge', 'Seconds spent on a phase of preparing a rule last time.', [
+                ((('rule', rule), ('phase', phase)), getattr(stats, f'{phase}_seconds'))
+                for rule, stats in self.rules.items()
+                for phase in ('fetch', 'items', 'sort')
+            ])
+            add('output_bytes', 'gauge', 'Size of the last rendered sitemap.', [
+                ((('encoding', encoding),), size) for encoding, size in sorted(self.output_bytes.items())
+            ])
+            add('cache_hits_total', 'counter', 'Number of cache hits.', [
+                ((('cache', kind),), count) for kind, count in sorted(self.cache_hits.items())
+            ])
+            add('cache_misses_total', 'counter', 'Number of cache misses.', [
+                ((('cache', kind),), count) for kind, count in sorted(self.cache_misses.items())
+            ])
+
+        return '\n'.join(lines) + '\n'
+
+    def _notify(self, event: str):
+        for callback in self._callbacks:
+            try:
+                callback(event, self)
+            except Exception:
+                logger.exception('Sitemap statistics callback failed')
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
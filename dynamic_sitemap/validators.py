@@ -1,10 +1,8 @@
 import enum
-from re import VERBOSE, match
+import re
 from typing import Generic, List, Optional, TypeVar, Union
 from urllib.parse import urlparse
 
-from pytz import UnknownTimeZoneError, timezone
-
 from .exceptions import SitemapValidationError
 
 
@@ -22,22 +20,33 @@ class ChangeFreq(enum.Enum):
         return [i.value for i in cls]
 
 
+CHANGE_FREQ_VALUES = frozenset(ChangeFreq.values())
+
+
 Value = TypeVar('Value')
 
 
 class Parameter(Generic[Value]):
-    """A descriptor to check configuration parameters values"""
-    __slots__ = ('default', 'storage')
+    """A descriptor to check configuration parameters values.
+    A value is stored in the instance attribute named after the descriptor with a leading underscore,
+    so classes with __slots__ should declare it.
+    """
+    __slots__ = ('default', 'attr')
 
     def __init__(self, default: Optional[Value] = None):
         self.default = default
-        self.storage: dict = {}
+        self.attr = ''
+
+    def __set_name__(self, owner, name: str):
+        self.attr = '_' + name
 
     def __get__(self, instance, owner) -> Value:
-        return self.storage.get(id(instance), self.default)
+        if instance is None:
+            return self.default    # type: ignore
+        return getattr(instance, self.attr, self.default)    # type: ignore
 
     def __set__(self, instance, value: Value):
-        self.storage[id(instance)] = self.validate(value)
+        setattr(instance, self.attr, self.validate(value))
 
     @classmethod
     def validate(cls, value: Value) -> Value:
@@ -64,31 +73,32 @@ class LastModified(Parameter):
     """A descriptor to check lastmod parameter values according to https://www.w3.org/TR/NOTE-datetime"""
     __slots__ = ()
 
+    pattern = re.compile(
+        r"""
+        (?P<date>
+            (?P<year>20[0-9]{2})-
+            (?P<month>0[0-9]|1[0-2])-
+            (?P<day>[0-2][0-9]|3[0-1])
+        )
+        (T
+            (?P<time>
+                (?P<hours>[0-1][0-9]|2[0-3]):
+                (?P<minutes>[0-5][0-9]):
+                (?P<seconds>[0-5][0-9])
+            )
+            (?P<timezone>[+-][0-5][0-9]:[0-5][0-9])?
+        )?
+        """,
+        re.VERBOSE,
+    )
+
     @classmethod
     def validate(cls, value: Optional[str]) -> Optional[str]:
         if value is None:
             return None
 
-        pattern = (
-            """
-            (?P<date>
-                (?P<year>20[0-9]{2})-
-                (?P<month>0[0-9]|1[0-2])-
-                (?P<day>[0-2][0-9]|3[0-1])
-            )
-            (T
-                (?P<time>
-                    (?P<hours>[0-1][0-9]|2[0-3]):
-                    (?P<minutes>[0-5][0-9]):
-                    (?P<seconds>[0-5][0-9])
-                )
-                (?P<timezone>[+-][0-5][0-9]:[0-5][0-9])?
-            )?
-            """
-        )
-
         if not (
-            isinstance(value, str) and match(pattern, value, VERBOSE)
+            isinstance(value, str) and cls.pattern.match(value)
         ):
             raise SitemapValidationError(
                 'Last modified should be of the format: YYYY-MM-DD[Thh:mm:ss[±hh:mm]]. Time and timezone is optional.',
@@ -107,7 +117,7 @@ class ChangeFrequency(Parameter):
 
         if not (
             isinstance(value, str)
-            and (value.casefold() in ChangeFreq.values())
+            and (value.casefold() in CHANGE_FREQ_VALUES)
         ):
             raise SitemapValidationError(
                 'Change frequency should be one of the following: ' + ', '.join(ChangeFreq.values()),
@@ -146,9 +156,12 @@ class Timezone(Parameter):
         if not isinstance(value, str):
             raise SitemapValidationError(msg)
 
+        # pytz is imported only when a time zone is set
+        import pytz
+
         try:
-            timezone(value)
-        except UnknownTimeZoneError:
+            pytz.timezone(value)
+        except pytz.UnknownTimeZoneError:
             raise SitemapValidationError(msg)
         return value
 
@@ -27,6 +27,7 @@ if __name__ == '__main__':
         install_requires=['pytz>=2020.1'],
         classifiers=[
             'Development Status :: 3 - Alpha',
+            'Framework :: Django',
             'Framework :: Flask',
             'Intended Audience :: Developers',
             'License :: OSI Approved :: MIT License',
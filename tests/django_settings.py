@@ -0,0 +1,15 @@
+"""Settings of a Django project to test DjangoSitemap with a local SQLite database."""
+SECRET_KEY = 'test'
+DEBUG = False
+ALLOWED_HOSTS = ['testserver']
+INSTALLED_APPS = []
+ROOT_URLCONF = 'tests.unit.test_django'
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    },
+}
+USE_TZ = True
+# the process time zone is kept for the other tests
+TIME_ZONE = None
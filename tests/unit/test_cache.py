@@ -0,0 +1,139 @@
+import gzip
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from dynamic_sitemap import core
+from dynamic_sitemap.cache import FileSystemCache, MemoryCache, SQLiteCache
+from dynamic_sitemap.exceptions import SitemapValidationError
+from dynamic_sitemap.helpers import Model
+from tests.utils import TEST_URL, SitemapMock
+
+
+@pytest.fixture(params=['memory', 'filesystem', 'sqlite'])
+def get_cache(request, tmp_path):
+    def factory(**kwargs):
+        if request.param == 'filesystem':
+            return FileSystemCache(str(tmp_path / 'cache'), **kwargs)
+        if request.param == 'sqlite':
+            return SQLiteCache(str(tmp_path / 'cache.db'), **kwargs)
+        return MemoryCache(**kwargs)
+    return factory
+
+
+def test_cache_values(get_cache):
+    cache = get_cache()
+    assert cache.get('key') is None
+
+    cache.set('key', b'value')
+    cache.set('other', b'')
+    assert cache.get('key') == b'value'
+    assert cache.get('other') == b''
+
+    cache.delete('key')
+    assert cache.get('key') is None
+
+    cache.clear()
+    assert cache.get('other') is None
+
+
+def test_cache_ttl(get_cache):
+    cache = get_cache(ttl=0.05)
+    cache.set('key', b'value')
+    assert cache.get('key') == b'value'
+
+    time.sleep(0.1)
+    assert cache.get('key') is None
+
+
+def test_cache_lru_eviction(get_cache):
+    """Test least recently used values are evicted to fit into the size."""
+    cache = get_cache(max_size=10)
+    cache.set('first', b'1234')
+    time.sleep(0.01)
+    cache.set('second', b'1234')
+    time.sleep(0.01)
+    assert cache.get('first') == b'1234'
+    time.sleep(0.01)
+    cache.set('third', b'1234')
+
+    assert cache.get('second') is None
+    assert cache.get('first') == cache.get('third') == b'1234'
+
+
+@pytest.mark.parametrize('kwargs', [{'ttl': 0}, {'ttl': '1'}, {'max_size': 0}, {'max_size': 1.5}])
+def test_cache_bad_limits(kwargs):
+    with pytest.raises(SitemapValidationError):
+        MemoryCache(**kwargs)
+
+
+def test_cache_shared(tmp_path):
+    """Test caches of the same storage share values."""
+    for cls, path in ((FileSystemCache, tmp_path / 'cache'), (SQLiteCache, tmp_path / 'cache.db')):
+        cls(str(path)).set('key', b'value')
+        assert cls(str(path)).get('key') == b'value'
+
+
+def test_cache_sitemap(get_cache):
+    """Test sitemaps sharing a cache fetch and render data once."""
+    cache = get_cache()
+    calls = []
+
+    def extractor():
+        calls.append(1)
+        return [('slug', datetime(2020, 1, 1))]
+
+    sitemaps = []
+    for _ in range(2):
+        sitemap = SitemapMock(TEST_URL, cache=cache)
+        sitemap.cache_period = timedelta(hours=1)
+        sitemap._rules = ['/rule/<slug>/']
+        sitemap.add_rule('/rule', Model(extractor), loc_from='slug')
+        sitemaps.append(sitemap)
+
+    sitemaps[0].build()
+    first = sitemaps[0]._get_rendered()
+    second = sitemaps[1]._get_rendered()
+    assert calls == [1]
+    assert first == second
+
+    sitemaps[1].build()
+    assert calls == [1]
+    assert sitemaps[1].render() == sitemaps[0].render()
+
+
+def test_cache_sitemap_expired(get_cache, monkeypatch):
+    """Test data cached by another sitemap is used within the cache period only."""
+    cache = get_cache()
+    rows = [('old', datetime(2020, 1, 1))]
+
+    def get_sitemap():
+        sitemap = SitemapMock(TEST_URL, cache=cache)
+        sitemap.cache_period = timedelta(minutes=1)
+        sitemap._rules = ['/rule/<slug>/']
+        sitemap.add_rule('/rule', Model(lambda: list(rows)), loc_from='slug')
+        return sitemap
+
+    get_sitemap()._get_rendered()
+    rows[:] = [('new', datetime(2020, 1, 1))]
+    assert '/rule/old/' in get_sitemap()._get_rendered().data.decode()
+
+    now = time.time()
+    monkeypatch.setattr(core, 'time', lambda: now + 60)
+    sitemap = get_sitemap()
+    assert '/rule/new/' in sitemap._get_rendered().data.decode()
+    assert {item.loc for item in sitemap.items} == {f'{TEST_URL}/rule/new/', f'{TEST_URL}/'}
+
+
+@pytest.mark.parametrize('shared', [False, True])
+def test_cache_sitemap_streamed(shared):
+    """Test a streamed gzipped sitemap is kept without the plain one unless it is shared by a cache."""
+    sitemap = SitemapMock(TEST_URL, cache=MemoryCache() if shared else None)
+    sitemap.cache_period = timedelta(hours=1)
+    data = b''.join(sitemap._iter_rendered('gzip'))
+    rendered = sitemap._snapshot.rendered
+
+    assert rendered['gzip'].data == data
+    assert (None in rendered) is shared
+    assert gzip.decompress(data).decode() == sitemap.render()
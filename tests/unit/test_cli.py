@@ -0,0 +1,105 @@
+import os
+from xml.etree import ElementTree
+
+import pytest
+
+from dynamic_sitemap.cli import get_sitemap, load_object, main, render_shard
+from dynamic_sitemap.exceptions import SitemapValidationError
+
+from ..utils import TEST_URL, SitemapMock, create_sitemap
+
+
+FACTORY = 'tests.utils:create_sitemap'
+NS = {'s': 'http://www.sitemaps.org/schemas/sitemap/0.9'}
+
+
+@pytest.fixture
+def max_items(monkeypatch):
+    # the configuration is shared, so it is restored after a test
+    monkeypatch.setattr(SitemapMock.config, 'MAX_ITEMS', SitemapMock.config.MAX_ITEMS)
+
+
+def get_locs(filename):
+    return [loc.text for loc in ElementTree.parse(filename).getroot().iterfind('.//s:loc', NS)]
+
+
+def test_load_object():
+    assert load_object(FACTORY) is create_sitemap
+    assert load_object('os:path.join') is os.path.join
+
+
+@pytest.mark.parametrize('path', ['tests.utils', ':create_sitemap', 'tests.utils:'])
+def test_load_object_bad_path(path):
+    with pytest.raises(SitemapValidationError):
+        load_object(path)
+
+
+def test_get_sitemap(max_items):
+    sitemap = get_sitemap(FACTORY, 'tests.utils:CLIConfig')
+    assert isinstance(sitemap, SitemapMock)
+    assert sitemap.config.MAX_ITEMS == 4
+
+
+def test_get_sitemap_not_sitemap():
+    with pytest.raises(SitemapValidationError):
+        get_sitemap('tests.utils:get_values')
+
+
+def test_dry_run(capsys, tmp_path):
+    assert main([FACTORY, '--dry-run', '-o', str(tmp_path / 'sitemap.xml')]) == 0
+    out = capsys.readouterr().out
+    assert '/rule/<slug>/' in out
+    assert 'total' in out and '11' in out
+    assert not os.listdir(tmp_path)
+
+
+def test_generate_single(capsys, tmp_path):
+    filename = tmp_path / 'sitemap.xml'
+    assert main([FACTORY, '-o', str(filename)]) == 0
+    assert len(get_locs(filename)) == 11
+    assert 'URLs/s' in capsys.readouterr().out
+
+
+@pytest.mark.parametrize('workers', ['1', '2'])
+def test_generate_shards(max_items, capsys, tmp_path, workers):
+    filename = tmp_path / 'sitemap.xml'
+    assert main([FACTORY, '-c', 'tests.utils:CLIConfig', '-o', str(filename), '-w', workers]) == 0
+
+    shards = [tmp_path / f'sitemap-{number}.xml' for number in (1, 2, 3)]
+    assert sorted(os.listdir(tmp_path)) == ['sitemap-1.xml', 'sitemap-2.xml', 'sitemap-3.xml', 'sitemap.xml']
+    assert get_locs(filename) == [f'{TEST_URL}/{shard.name}' for shard in shards]
+
+    locs = [loc for shard in shards for loc in get_locs(shard)]
+    assert len(locs) == 11
+    assert locs == sorted(locs)
+
+
+def test_render_shard_too_big(tmp_path):
+    filename = str(tmp_path / 'sitemap-1.xml')
+    with pytest.raises(SitemapValidationError):
+        render_shard(filename, [(f'{TEST_URL}/page/', None, None, None)], 100)
+    assert not os.listdir(tmp_path)
+
+
+def test_generate_shards_incremental(max_items, monkeypatch, tmp_path):
+    monkeypatch.setattr(SitemapMock.config, 'MANIFEST', str(tmp_path / 'manifest.json'))
+    filename = tmp_path / 'sitemap.xml'
+    args = [FACTORY, '-c', 'tests.utils:CLIConfig', '-o', str(filename), '-w', '1']
+    assert main(args) == 0
+
+    files = [tmp_path / f'sitemap-{number}.xml' for number in (1, 2, 3)]
+    for path in files:
+        os.utime(path, (0, 0))
+
+    assert main(args) == 0
+    assert all(os.path.getmtime(path) == 0 for path in files)
+
+
+def test_generate_spilled(max_items, monkeypatch, tmp_path):
+    monkeypatch.setattr(SitemapMock.config, 'SPILL_ITEMS', 3)
+    filename = tmp_path / 'sitemap.xml'
+    assert main([FACTORY, '-c', 'tests.utils:CLIConfig', '-o', str(filename), '-w', '2']) == 0
+
+    locs = [loc for number in (1, 2, 3) for loc in get_locs(tmp_path / f'sitemap-{number}.xml')]
+    assert len(locs) == 11
+    assert locs == sorted(locs)
@@ -1,18 +1,36 @@
+import atexit
+import gzip
+import json
 import os
-from datetime import datetime
+import threading
+import time
+from datetime import datetime, timedelta, timezone
 from operator import attrgetter
+from unittest.mock import Mock
 from urllib.parse import urljoin
 from uuid import uuid4
+from xml.etree import ElementTree
 
 import pytest
+import pytz
 
 from dynamic_sitemap import ChangeFreq, SitemapConfig
-from dynamic_sitemap.helpers import join_url_path
+from dynamic_sitemap.exceptions import SitemapValidationError
+from dynamic_sitemap.helpers import (
+    DatetimeFormatter, Model, PrefixMatcher, get_fetcher, get_iso_datetime,
+    join_url_path,
+)
+from dynamic_sitemap.items import SitemapItem
+from dynamic_sitemap.locks import FileLock
+from dynamic_sitemap.renderers import SitemapXMLRenderer
 from tests.utils import (
     TEST_DATE_STR, TEST_TIME_STR, TEST_URL, ORMModel, SitemapMock,
 )
 
 
+XMLNS = '{http://www.sitemaps.org/schemas/sitemap/0.9}'
+
+
 @pytest.mark.parametrize('obj', [
     SitemapConfig(),
     type('Config', tuple(), {}),    # noqa: C408
@@ -50,6 +68,23 @@ def test_default_build(sitemap, monkeypatch):
     assert sitemap.initialized
 
 
+def test_default_build_repeated(local_model, monkeypatch):
+    """Test items are kept on the next build and the cache is refreshed."""
+    sitemap = SitemapMock(TEST_URL, orm=None)
+    sitemap._rules = ['/rule/<slug>/']
+    sitemap.add_rule('/rule', local_model, loc_from='slug')
+    sitemap.build()
+    locs = {item.loc for item in sitemap.items}
+
+    monkeypatch.setattr(sitemap, 'cache_period', timedelta(hours=1))
+    sitemap._cached_at = datetime(2020, 1, 1)
+    sitemap.build()
+
+    assert len(locs) == 3
+    assert {item.loc for item in sitemap.items} == locs
+    assert sitemap._should_use_cache()
+
+
 def test_default_add_items(sitemap, monkeypatch):
     """Test an item creation."""
     monkeypatch.setattr(sitemap, '_without_ignored', lambda: [])
@@ -188,3 +223,530 @@ def test_helpers_model_add_rule(sitemap, local_model):
     assert path_model.attrs['loc_from'] == slug
     assert path_model.attrs['lastmod_from'] == lastmod
     assert path_model.attrs['priority'] == 0.9
+
+
+@pytest.mark.parametrize('max_items, max_size, shards', [
+    pytest.param(50000, 50 * 1024 * 1024, 1, id='Fits into a single file'),
+    pytest.param(10, 50 * 1024 * 1024, 3, id='Split by items'),
+    pytest.param(50000, 600, 4, id='Split by size'),
+])
+def test_default_write_sharded(sitemap, tmp_path, monkeypatch, max_items, max_size, shards):
+    """Test a sitemap is split into files within limits and an index is written."""
+    monkeypatch.setattr(sitemap.config, 'MAX_ITEMS', max_items)
+    monkeypatch.setattr(sitemap.config, 'MAX_SIZE', max_size)
+    sitemap.add_items(*(f'/page/{i}' for i in range(24)))
+    sitemap.build()
+
+    filename = tmp_path / 'sitemap.xml'
+    written = sitemap.write_sharded(str(filename))
+    assert len(written) == shards
+
+    locs = []
+    for shard in written:
+        assert os.path.getsize(shard) <= max_size
+        tree = ElementTree.parse(shard)
+        assert len(tree.getroot()) <= max_items
+        locs.extend(el.find(f'{XMLNS}loc').text for el in tree.getroot())
+    assert locs == sorted(item.loc for item in sitemap.items)
+
+    index = ElementTree.parse(str(filename)).getroot()
+    assert index.tag == f'{XMLNS}sitemapindex'
+    assert [el.find(f'{XMLNS}loc').text for el in index] == [
+        f'{TEST_URL}/sitemap-{i}.xml' for i in range(1, shards + 1)
+    ]
+
+
+def test_default_write_sharded_gzip(sitemap, tmp_path, monkeypatch):
+    """Test shards of a compressed index are compressed too."""
+    monkeypatch.setattr(sitemap.config, 'MAX_ITEMS', 2)
+    sitemap.add_items('/page1', '/page2')
+    sitemap.build()
+
+    written = sitemap.write_sharded(str(tmp_path / 'sitemap.xml.gz'))
+    assert [os.path.basename(shard) for shard in written] == ['sitemap-1.xml.gz', 'sitemap-2.xml.gz']
+
+    with gzip.open(written[0]) as file:
+        assert ElementTree.parse(file).getroot().tag == f'{XMLNS}urlset'
+
+
+def test_default_write_sharded_incremental(sitemap, tmp_path, monkeypatch):
+    """Test only changed shards are rewritten and get a new lastmod in the index."""
+    manifest = tmp_path / 'manifest.json'
+    monkeypatch.setattr(sitemap.config, 'MAX_ITEMS', 3)
+    monkeypatch.setattr(sitemap.config, 'MANIFEST', str(manifest))
+    sitemap.add_items(*(f'/page/{i}' for i in range(8)))
+    sitemap.build()
+
+    filename = tmp_path / 'sitemap.xml'
+    written = sitemap.write_sharded(str(filename))
+    assert len(written) == 3
+    data = json.loads(manifest.read_text())
+    assert data['index'] == 'sitemap.xml'
+    for entry in data['shards']:
+        entry['lastmod'] = '2020-01-01T00:00:00'
+    manifest.write_text(json.dumps(data))
+
+    for path in [filename, *written]:
+        os.utime(path, (0, 0))
+
+    # nothing is changed, so nothing is touched
+    sitemap.write_sharded(str(filename))
+    assert all(os.path.getmtime(path) == 0 for path in [filename, *written])
+
+    # the last shard is changed
+    sitemap._static_items = {item for item in sitemap.items if item.loc != f'{TEST_URL}/page/7'}
+    rewritten = sitemap.write_sharded(str(filename))
+    assert rewritten == written
+    assert [os.path.getmtime(path) == 0 for path in written] == [True, True, False]
+
+    entries = json.loads(manifest.read_text())['shards']
+    lastmods = [el.find(f'{XMLNS}lastmod').text for el in ElementTree.parse(str(filename)).getroot()]
+    assert lastmods == [entry['lastmod'] for entry in entries]
+    assert lastmods[:2] == ['2020-01-01T00:00:00'] * 2
+    assert lastmods[2] > lastmods[1]
+    assert [entry['count'] for entry in entries] == [3, 3, 2]
+    assert entries[2]['last'] == f'{TEST_URL}/page/6'
+
+
+def test_default_index_lastmod(sitemap, tmp_path, monkeypatch):
+    """Test the index page is modified at the start or with a manifest when the latest of other pages is."""
+    sitemap.add_items('/a')
+    assert {item.loc: item for item in sitemap._get_static_items()}[f'{TEST_URL}/'].lastmod == sitemap.started_at
+
+    sitemap = SitemapMock(TEST_URL)
+    monkeypatch.setattr(sitemap.config, 'MANIFEST', str(tmp_path / 'manifest.json'))
+    sitemap.add_items({'loc': '/a', 'lastmod': '2020-01-01'}, {'loc': '/b', 'lastmod': '2020-02-01'}, '/c')
+    sitemap.build()
+    index = {item.loc: item for item in sitemap.items}[f'{TEST_URL}/']
+    assert index.lastmod == '2020-02-01'
+
+    items = {item.loc: item for item in sitemap._get_static_items('2021-01-01')}
+    assert items[f'{TEST_URL}/'].lastmod == '2021-01-01'
+
+
+def test_default_write_sharded_insert(sitemap, tmp_path, monkeypatch):
+    """Test shards are cut where they were, so an added or removed item rewrites only the shard of its range."""
+    monkeypatch.setattr(sitemap.config, 'MAX_ITEMS', 100)
+    monkeypatch.setattr(sitemap.config, 'MANIFEST', str(tmp_path / 'manifest.json'))
+    sitemap.add_items(*(f'/page/{i:04}' for i in range(0, 2000, 2)))
+    sitemap.build()
+    filename = str(tmp_path / 'sitemap.xml')
+    written = sitemap.write_sharded(filename)
+    assert len(written) == 11
+
+    def write_changed(*locs, removed=()):
+        for path in written:
+            os.utime(path, (0, 0))
+        items = {item for item in sitemap._static_items if item.loc not in removed}
+        sitemap._static_items = items | {SitemapItem(f'{TEST_URL}{loc}') for loc in locs}
+        return [path for path in sitemap.write_sharded(filename) if os.path.getmtime(path) != 0]
+
+    assert write_changed(removed={f'{TEST_URL}/page/0010'}) == written[:1]
+    assert write_changed('/page/0011') == written[:1]
+
+    # the overflowing range is split into a new shard
+    changed = write_changed('/page/0013')
+    assert changed == [written[0], str(tmp_path / 'sitemap-12.xml')]
+    assert len(os.listdir(tmp_path)) == 14
+
+
+@pytest.mark.parametrize('content', ['{"index": "sitemap.xml"}', '[]', '{"index": "sitemap.xml", "shards": [{}]}'])
+def test_default_manifest_broken(sitemap, tmp_path, monkeypatch, content):
+    """Test shards are rewritten if the manifest is broken."""
+    manifest = tmp_path / 'manifest.json'
+    manifest.write_text(content)
+    monkeypatch.setattr(sitemap.config, 'MANIFEST', str(manifest))
+    assert sitemap._load_manifest(str(tmp_path / 'sitemap.xml')) == {}
+
+
+def test_default_write_sharded_removes_stale(sitemap, tmp_path, monkeypatch):
+    """Test shards left from the previous writing are removed."""
+    monkeypatch.setattr(sitemap.config, 'MAX_ITEMS', 2)
+    monkeypatch.setattr(sitemap.config, 'MANIFEST', str(tmp_path / 'manifest.json'))
+    sitemap.add_items('/a', '/b', '/c', '/d')
+    sitemap.build()
+    sitemap.write_sharded(str(tmp_path / 'sitemap.xml'))
+    assert len(os.listdir(tmp_path)) == 5
+
+    sitemap._static_items = {item for item in sitemap._static_items if item.loc != f'{TEST_URL}/d'}
+    sitemap.write_sharded(str(tmp_path / 'sitemap.xml'))
+    assert sorted(os.listdir(tmp_path)) == ['manifest.json', 'sitemap-1.xml', 'sitemap-2.xml', 'sitemap.xml']
+
+
+@pytest.mark.parametrize('order', ['loc', 'lastmod'])
+@pytest.mark.parametrize('max_items', [3, 7, 50000])
+def test_default_publish_spilled(monkeypatch, tmp_path, max_items, order):
+    """Test a sitemap built out of core is the same as one built in memory."""
+    sitemap = SitemapMock(TEST_URL)
+    sitemap.cache_period = timedelta(hours=1)
+    sitemap._rules = ['/rule/<slug>/']
+    sitemap.add_rule('/rule', Model(lambda: [(slug, datetime(2020, 1, 1)) for slug in 'dbeac']), loc_from='slug')
+    sitemap.add_items('/about', '/rule/a/')
+    monkeypatch.setattr(sitemap.config, 'MAX_ITEMS', max_items)
+    monkeypatch.setattr(sitemap.config, 'ORDER', order)
+
+    expected = tmp_path / 'expected.xml'
+    sitemap.publish(str(expected))
+
+    spilled = tmp_path / 'spilled' / 'sitemap.xml'
+    spilled.parent.mkdir()
+    monkeypatch.setattr(sitemap.config, 'SPILL_ITEMS', 2)
+    monkeypatch.setattr(sitemap.config, 'SPILL_DIR', str(tmp_path))
+    sitemap.publish(str(spilled))
+
+    assert spilled.read_bytes() == expected.read_bytes().replace(b'expected', b'sitemap')
+    assert sitemap.stats.items == 7
+    assert sitemap.stats.rules['/rule/<slug>/'].rows == 5
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.run')]
+
+
+def test_default_publish_spilled_bloom_filter(monkeypatch, tmp_path):
+    """Test spilled items are deduplicated by a Bloom filter in the order they are fetched."""
+    sitemap = SitemapMock(TEST_URL)
+    sitemap._rules = ['/rule/<slug>/']
+    sitemap.add_rule('/rule', Model(lambda: [(slug, None) for slug in 'dbdac']), loc_from='slug')
+    sitemap.add_items('/rule/a/')
+    monkeypatch.setattr(sitemap.config, 'ORDER', 'none')
+    monkeypatch.setattr(sitemap.config, 'SPILL_ITEMS', 2)
+    monkeypatch.setattr(sitemap.config, 'BLOOM_ERROR_RATE', 0.001)
+
+    filename = tmp_path / 'sitemap.xml'
+    sitemap.publish(str(filename))
+    locs = [el.find(f'{XMLNS}loc').text for el in ElementTree.parse(str(filename)).getroot()]
+    assert locs[:4] == [f'{TEST_URL}/rule/{slug}/' for slug in 'dbac']
+    assert sorted(locs[4:]) == [f'{TEST_URL}/']
+
+
+def test_default_refresher():
+    """Test stale data is served while new one is prepared in background."""
+    sitemap = SitemapMock(TEST_URL)
+    rows = [('old', datetime(2020, 1, 1))]
+    gate, entered = threading.Event(), threading.Event()
+    gate.set()
+
+    def extractor():
+        entered.set()
+        gate.wait(5)
+        return list(rows)
+
+    sitemap._rules = ['/rule/<slug>/']
+    sitemap.add_rule('/rule', Model(extractor), loc_from='slug')
+    sitemap.build()
+    sitemap.start_refresher()
+
+    try:
+        gate.clear()
+        entered.clear()
+        rows[:] = [('new', datetime(2020, 1, 1))]
+        locs = {item.loc for item in sitemap._get_items()}
+        assert f'{TEST_URL}/rule/old/' in locs
+        assert f'{TEST_URL}/rule/new/' not in locs
+        assert entered.wait(5)
+    finally:
+        gate.set()
+        sitemap.stop_refresher(timeout=5)
+
+    locs = {item.loc for item in sitemap.items}
+    assert f'{TEST_URL}/rule/new/' in locs
+    assert f'{TEST_URL}/rule/old/' not in locs
+
+
+def test_default_refresher_stopped_at_exit(monkeypatch):
+    """Test the refresher is stopped on the interpreter exit unless it is stopped before."""
+    registered = {}
+    monkeypatch.setattr(atexit, 'register', lambda func, *args: registered.update({func: args}))
+    monkeypatch.setattr(atexit, 'unregister', lambda func: registered.pop(func, None))
+    sitemap = SitemapMock(TEST_URL)
+    sitemap.start_refresher()
+    sitemap.start_refresher()
+
+    assert registered == {sitemap.stop_refresher: (sitemap.config.REBUILD_TIMEOUT,)}
+    assert sitemap._refresher.running
+
+    sitemap.stop_refresher(*registered[sitemap.stop_refresher])
+    assert not sitemap._refresher.running
+    assert not registered
+
+
+@pytest.mark.parametrize('running, max_staleness, cached_at, result', [
+    pytest.param(False, timedelta(0), datetime.now(), False, id='Refresher stopped'),
+    pytest.param(True, timedelta(0), datetime(2020, 1, 1), True, id='Unlimited staleness'),
+    pytest.param(True, timedelta(hours=1), datetime.now(), True, id='Staleness within limit'),
+    pytest.param(True, timedelta(hours=1), datetime(2020, 1, 1), False, id='Staleness exceeded'),
+])
+def test_default_can_serve_stale(sitemap, running, max_staleness, cached_at, result):
+    """Test conditions to serve stale data."""
+    sitemap.items = {1}
+    sitemap.max_staleness = max_staleness
+    sitemap._cached_at = cached_at
+    sitemap._refresher = Mock(running=running)
+    assert sitemap._can_serve_stale() is result
+
+
+def test_default_single_flight_rebuild():
+    """Stress test: concurrent requests after expiration rebuild data once and get complete data."""
+    threads_count, rounds, rows_count = 16, 5, 200
+    calls = []
+
+    def extractor():
+        calls.append(1)
+        time.sleep(0.05)
+        return [(f'slug-{i}', datetime(2020, 1, 1)) for i in range(rows_count)]
+
+    sitemap = SitemapMock(TEST_URL)
+    sitemap._rules = ['/rule/<slug>/']
+    sitemap.add_rule('/rule', Model(extractor), loc_from='slug')
+    sitemap.build()
+    calls.clear()
+
+    for _ in range(rounds):
+        barrier = threading.Barrier(threads_count)
+        sitemap._cached_at = datetime(2020, 1, 1)    # the data is expired
+        results = []
+
+        def request():
+            barrier.wait()
+            results.append(sitemap._get_items())
+
+        threads = [threading.Thread(target=request) for _ in range(threads_count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+
+        assert len(results) == threads_count
+        assert all(len(items) == rows_count + 1 for items in results)
+        assert all(isinstance(items, tuple) for items in results)
+
+    assert len(calls) == rounds
+
+
+def test_default_rebuild_timeout(monkeypatch):
+    """Test the stale data is used when a rebuild by another thread takes too long."""
+    sitemap = SitemapMock(TEST_URL)
+    sitemap.build()
+    stale = sitemap._snapshot
+    monkeypatch.setattr(sitemap.config, 'REBUILD_TIMEOUT', 0.01)
+
+    with sitemap._build_lock:
+        assert sitemap._rebuild(stale) is stale
+
+
+@pytest.mark.parametrize('workers', [0, 4])
+def test_default_fetch_workers(monkeypatch, workers):
+    """Test rules are fetched concurrently with the same result and timings are reported."""
+    rules = [f'/rule{i}/<slug>/' for i in range(4)]
+    threads = set()
+
+    def get_extractor(number):
+        def extractor():
+            threads.add(threading.get_ident())
+            time.sleep(0.05)
+            return [(f'slug-{number}-{i}', datetime(2020, 1, 1)) for i in range(10)]
+        return extractor
+
+    monkeypatch.setattr(SitemapMock.config, 'FETCH_WORKERS', workers)
+    sitemap = SitemapMock(TEST_URL)
+    sitemap._rules = rules
+    for i in range(len(rules)):
+        sitemap.add_rule(f'/rule{i}', Model(get_extractor(i)), loc_from='slug')
+
+    started = time.perf_counter()
+    sitemap.build()
+    elapsed = time.perf_counter() - started
+
+    assert len(sitemap.items) == 41
+    timings = [sitemap.stats.rules[rule].seconds for rule in rules]
+    assert list(sitemap.stats.rules) == rules
+    assert all(timing >= 0.05 for timing in timings)
+    if workers:
+        assert len(threads) > 1
+        assert elapsed < sum(timings)
+    else:
+        assert threads == {threading.get_ident()}
+
+
+@pytest.mark.parametrize('fields, result', [
+    (['slug'], [('slug1',), ('slug2',)]),
+    (['slug', 'lastmod'], [('slug1', datetime(2020, 1, 1)), ('slug2', datetime(2020, 2, 2))]),
+])
+def test_helpers_fetch_local(local_model, fields, result):
+    """Test fetching tuples of fields from helpers.Model."""
+    assert list(get_fetcher()(local_model, fields)) == result
+
+
+def test_helpers_fetch_sqlalchemy():
+    """Test fetching only required columns with SQLAlchemy."""
+    sqlalchemy = pytest.importorskip('sqlalchemy')
+    from sqlalchemy.orm import declarative_base, scoped_session, sessionmaker
+
+    engine = sqlalchemy.create_engine('sqlite://')
+    session = scoped_session(sessionmaker(bind=engine))
+    base = declarative_base()
+
+    class Post(base):
+        __tablename__ = 'post'
+        query = session.query_property()
+        id = sqlalchemy.Column(sqlalchemy.Integer, primary_key=True)    # noqa: A003, VNE003
+        slug = sqlalchemy.Column(sqlalchemy.String)
+        updated = sqlalchemy.Column(sqlalchemy.DateTime)
+        body = sqlalchemy.Column(sqlalchemy.Text)
+
+    statements = []
+    sqlalchemy.event.listen(engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+    base.metadata.create_all(engine)
+    session.add_all(Post(slug=f'slug-{i}', updated=datetime(2020, 1, 1), body='text') for i in range(5))
+    session.commit()
+
+    rows = list(get_fetcher('sqlalchemy')(Post, ['slug', 'updated']))
+    assert rows == [(f'slug-{i}', datetime(2020, 1, 1)) for i in range(5)]
+    assert 'body' not in statements[-1]
+
+    statements.clear()
+    assert list(get_fetcher('sqlalchemy')(Post, ['slug', 'updated'], batch_size=2)) == rows
+    assert len(statements) == 3
+    assert all('LIMIT' in statement and 'body' not in statement for statement in statements)
+    assert 'post.id >' in statements[-1]
+    session.remove()
+
+
+@pytest.mark.parametrize('with_keys', [False, True])
+def test_helpers_model_pages(with_keys):
+    """Test helpers.Model is walked by pages with a cursor."""
+    table = [(f'slug-{i:02}', datetime(2020, 1, 1), i) for i in range(25)]
+    calls = []
+
+    def extractor(after=None, limit=None):
+        calls.append(after)
+        rows = [row for row in table if after is None or row[2 if with_keys else 0] > after]
+        return [row if with_keys else row[:2] for row in rows[:limit]]
+
+    sitemap = SitemapMock(TEST_URL)
+    sitemap._rules = ['/rule/<slug>/']
+    sitemap.add_raw_rule('/rule', Model(extractor), batch_size=10)
+    sitemap.build()
+
+    assert len(sitemap.items) == 26
+    assert calls == [None, 9 if with_keys else 'slug-09', 19 if with_keys else 'slug-19']
+
+
+@pytest.mark.parametrize('batch_size', [0, 'many', -1])
+def test_default_add_rule_batch_size(sitemap, local_model, batch_size):
+    with pytest.raises(SitemapValidationError):
+        sitemap.add_rule('/app', local_model, loc_from='slug', batch_size=batch_size)
+
+
+@pytest.mark.parametrize('tz', [None, 'UTC', 'Etc/GMT+3', 'Europe/Moscow', 'Australia/Lord_Howe'])
+@pytest.mark.parametrize('dt', [
+    datetime(2020, 3, 29, 1, 30, 15, 999999),
+    datetime(2011, 10, 30, 2, 30),
+    datetime(1995, 7, 1, 12),
+    datetime(2020, 1, 1, tzinfo=timezone.utc),
+    pytz.timezone('America/New_York').localize(datetime(2021, 11, 7, 1, 30)),
+])
+def test_helpers_datetime_formatter(tz, dt):
+    """Test the formatter gives the same result as pytz."""
+    expected = (dt.astimezone(pytz.timezone(tz)) if tz else dt).isoformat(timespec='seconds')
+    formatter = DatetimeFormatter(tz)
+    assert formatter(dt) == expected
+    assert formatter.format_many([dt, dt]) == [expected, expected]
+    assert get_iso_datetime(dt, tz) == expected
+
+
+@pytest.mark.parametrize('string', ['', '/', '/ad', '/admin', '/admin/', '/administrator', '/static/x', '/blog'])
+def test_helpers_prefix_matcher(string):
+    prefixes = {'/admin', '/static/', '/st'}
+    assert PrefixMatcher(prefixes).match(string) is any(string.startswith(p) for p in prefixes)
+
+
+def test_helpers_prefix_matcher_empty_prefix():
+    assert PrefixMatcher(['']).match('/any')
+    assert not PrefixMatcher([]).match('/any')
+
+
+def test_default_rule_plans(sitemap, monkeypatch):
+    """Test rules are split once until rules or ignored URLs change."""
+    monkeypatch.setattr(SitemapMock, 'config', SitemapConfig())
+    sitemap._rules = ['/rule/<int:id>/page/', '/admin/<slug>/', '/about/']
+    plans = sitemap._get_plans()
+    assert plans == {
+        '/rule/<int:id>/page/': ('/rule/', '/page/'),
+        '/about/': ('/about/', '/about/'),
+    }
+    assert sitemap._get_plans() is plans
+
+    sitemap.ignore('/about')
+    assert list(sitemap._get_plans()) == ['/rule/<int:id>/page/', '/admin/<slug>/']
+
+    sitemap._rules.append('/blog/<slug>/')
+    assert '/blog/<slug>/' in sitemap._get_plans()
+
+
+@pytest.mark.parametrize('order', ['loc', 'lastmod', 'none'])
+def test_default_order(monkeypatch, order):
+    """Test rules' streams are merged into the same sitemap as sorting gives."""
+    monkeypatch.setattr(SitemapMock.config, 'ORDER', order)
+    sitemap = SitemapMock(TEST_URL)
+    sitemap._rules = ['/rule1/<slug>/', '/rule2/<slug>/']
+    sitemap.add_items('/rule1/b/', '/x')
+    for i in range(2):
+        sitemap.add_rule(f'/rule{i + 1}', Model(lambda: [(s, datetime(2020, 1, 1)) for s in 'dcba']), loc_from='slug')
+    sitemap.build()
+
+    snapshot = sitemap._get_snapshot()
+    assert (snapshot.streams is not None) is (order == 'loc')
+    assert len(list(sitemap._get_renderer().get_ordered())) == len(sitemap.items) == 10
+
+    if order == 'loc':
+        expected = SitemapXMLRenderer(sitemap.items).render()
+        assert sitemap.render() == expected
+
+
+def test_default_published(monkeypatch, tmp_path):
+    """Test the published file is reused until it expires and is updated by one holder of the lock."""
+    filename = str(tmp_path / 'sitemap.xml')
+    monkeypatch.setattr(SitemapMock.config, 'FILENAME', filename)
+    monkeypatch.setattr(SitemapMock.config, 'CACHE_PERIOD', 1)
+    sitemap = SitemapMock(TEST_URL)
+    sitemap.cache_period = timedelta(hours=1)
+    sitemap.build()
+    published = []
+    monkeypatch.setattr(sitemap, 'publish', lambda name: published.append(name) or sitemap.write(name))
+
+    assert sitemap._get_published() == filename
+    assert sitemap._get_published() == filename
+    assert published == [filename]
+    assert open(filename).read() == sitemap.render()
+
+    os.utime(filename, (0, 0))
+    with FileLock(filename + '.lock'):
+        assert sitemap._get_published() == filename
+    assert published == [filename]
+
+    assert sitemap._get_published() == filename
+    assert published == [filename, filename]
+
+
+@pytest.mark.parametrize('filename, shards_url, rule', [
+    pytest.param('sitemap.xml', '', '/sitemap-<int:number>.xml', id='Default'),
+    pytest.param('static/map.xml.gz', '', '/map-<int:number>.xml.gz', id='Compressed'),
+    pytest.param('sitemap.xml', TEST_URL + '/maps/', '/maps/sitemap-<int:number>.xml', id='Shards URL'),
+])
+def test_default_shards_rule(monkeypatch, tmp_path, filename, shards_url, rule):
+    """Test published shards are routed where the index points at."""
+    (tmp_path / 'static').mkdir()
+    monkeypatch.setattr(SitemapMock.config, 'FILENAME', str(tmp_path / filename))
+    monkeypatch.setattr(SitemapMock.config, 'SHARDS_URL', shards_url)
+    assert SitemapMock(TEST_URL)._get_shards_rule() == rule
+
+
+def test_default_publish_sharded(monkeypatch, tmp_path):
+    """Test a large sitemap is published as shards and an index."""
+    monkeypatch.setattr(SitemapMock.config, 'MAX_ITEMS', 2)
+    sitemap = SitemapMock(TEST_URL)
+    sitemap.add_items('/a', '/b')
+    sitemap.build()
+    sitemap.publish(str(tmp_path / 'sitemap.xml'))
+
+    assert sorted(os.listdir(tmp_path)) == ['sitemap-1.xml', 'sitemap-2.xml', 'sitemap.xml']
+    assert '<sitemapindex' in (tmp_path / 'sitemap.xml').read_text()
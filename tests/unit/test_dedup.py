@@ -0,0 +1,42 @@
+import pytest
+
+from dynamic_sitemap.dedup import BloomFilter, unique
+from dynamic_sitemap.exceptions import SitemapValidationError
+from dynamic_sitemap.items import SitemapItem
+
+from ..utils import TEST_URL
+
+
+@pytest.mark.parametrize('seen', [None, set(), BloomFilter(10, 0.001)])
+def test_unique(seen):
+    """Test the first item of a location is kept."""
+    first = [SitemapItem(f'{TEST_URL}/{slug}', '2020-01-01') for slug in 'ba']
+    second = [SitemapItem(f'{TEST_URL}/{slug}', '2021-01-01') for slug in 'abc']
+    items = list(unique(first + second, seen))
+    assert [(item.loc, item.lastmod) for item in items] == [
+        (f'{TEST_URL}/b', '2020-01-01'),
+        (f'{TEST_URL}/a', '2020-01-01'),
+        (f'{TEST_URL}/c', '2021-01-01'),
+    ]
+
+
+def test_bloom_filter_grows():
+    """Test a filter keeps its error rate when it is added more locations than its capacity."""
+    seen = BloomFilter(1000, 0.01)
+    added = [f'{TEST_URL}/page/{i}' for i in range(5000)]
+    new = sum(seen.add(loc) for loc in added)
+
+    assert new >= 5000 * 0.99
+    assert all(loc in seen for loc in added)
+    assert not any(seen.add(loc) for loc in added)
+    assert len(seen._slices) == 3
+
+    false_positives = sum(f'{TEST_URL}/other/{i}' in seen for i in range(10000))
+    assert false_positives / 10000 < 0.01
+    assert seen.size < 5000 * 4
+
+
+@pytest.mark.parametrize('capacity, error_rate', [(0, 0.01), (10, 0.0), (10, 1.0), (10, 1)])
+def test_bloom_filter_bad_arguments(capacity, error_rate):
+    with pytest.raises(SitemapValidationError):
+        BloomFilter(capacity, error_rate)
@@ -0,0 +1,230 @@
+import gzip
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from unittest.mock import Mock
+
+import pytest
+
+from dynamic_sitemap.contrib.django import DjangoSitemap
+from tests.utils import TEST_URL
+
+
+try:
+    import django
+except ImportError:
+    django = None
+    pytestmark = pytest.mark.not_installed
+
+if django is not None:
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tests.django_settings')
+    django.setup()
+
+    from django.db import connection, models
+    from django.db.models.query import QuerySet
+    from django.http import HttpResponse
+    from django.test import Client
+    from django.urls import clear_url_caches, include, path, re_path
+
+    class Post(models.Model):
+        slug = models.SlugField(unique=True)
+        updated = models.DateTimeField()
+
+        class Meta:
+            app_label = 'tests'
+
+    def page(request, **kwargs):
+        return HttpResponse()
+
+    urlpatterns = [
+        path('', page),
+        path('blog/', include([path('<slug:slug>/', page)])),
+        re_path(r'^about/$', page),
+        path('admin/', page),
+        re_path(r'^archive/(?P<year>[0-9]{4})/$', page),
+    ]
+
+
+@pytest.fixture(scope='module')
+def posts():
+    with connection.schema_editor() as editor:
+        editor.create_model(Post)
+
+    updated = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    Post.objects.bulk_create(Post(slug=f'post-{i}', updated=updated) for i in range(3))
+    yield
+    with connection.schema_editor() as editor:
+        editor.delete_model(Post)
+
+
+@pytest.fixture
+def django_map(request, posts, monkeypatch):
+    sitemap = DjangoSitemap(TEST_URL)
+    sitemap.add_rule('/blog', Post, loc_from='slug', lastmod_from='updated')
+    monkeypatch.setattr(sys.modules[__name__], 'urlpatterns', urlpatterns + sitemap.urls)
+    clear_url_caches()
+    request.addfinalizer(clear_url_caches)
+    return sitemap
+
+
+def test_django_get_rules(django_map):
+    """Test rules are discovered from the resolver, patterns with groups are skipped."""
+    assert django_map.get_rules() == ['/', '/blog/<slug:slug>/', '/about/', '/admin/', '/sitemap.xml']
+    assert list(django_map._get_plans()) == ['/blog/<slug:slug>/']
+
+
+def test_django_static_paths(django_map, monkeypatch):
+    """Test paths without converters are added as items unless they are ignored or served by the sitemap."""
+    monkeypatch.setattr(django_map.config, 'IGNORED', {'/admin'})
+    django_map.build()
+    locs = {item.loc for item in django_map.items}
+
+    assert {f'{TEST_URL}/', f'{TEST_URL}/about/', f'{TEST_URL}/blog/post-0/'} <= locs
+    assert f'{TEST_URL}/sitemap.xml' not in locs
+    assert f'{TEST_URL}/admin/' not in locs
+    assert django_map.initial_items == ['/about/']
+
+
+def test_django_fetch_iterator(django_map, monkeypatch):
+    """Test rows are fetched by QuerySet.iterator()."""
+    calls = []
+    iterator = QuerySet.iterator
+
+    def spy(self, *args, **kwargs):
+        calls.append(1)
+        return iterator(self, *args, **kwargs)
+
+    monkeypatch.setattr(QuerySet, 'iterator', spy)
+    django_map.build()
+
+    assert calls
+    assert f'{TEST_URL}/blog/post-0/' in {item.loc for item in django_map.items}
+
+
+def test_django_view(django_map):
+    """Test http response."""
+    response = Client().get('/sitemap.xml')
+
+    assert response.status_code == 200
+    assert response['Content-Type'] == 'application/xml'
+    assert response.content.decode() == django_map.render()
+    assert '<lastmod>2020-01-01T00:00:00+00:00</lastmod>' in django_map.render()
+
+
+def test_django_view_conditional(django_map, monkeypatch):
+    """Test 304 responses and the content encoding negotiation."""
+    monkeypatch.setattr(django_map, 'cache_period', timedelta(hours=1))
+    client = Client()
+    response = client.get('/sitemap.xml', HTTP_ACCEPT_ENCODING='gzip, deflate')
+    etag, modified = response['ETag'], response['Last-Modified']
+
+    assert response['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response['Vary']
+    assert gzip.decompress(response.content).decode() == django_map.render()
+    assert client.get('/sitemap.xml', HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=etag).status_code == 304
+    assert client.get('/sitemap.xml', HTTP_IF_MODIFIED_SINCE=modified).status_code == 304
+    assert client.get('/sitemap.xml', HTTP_IF_NONE_MATCH='"other"').status_code == 200
+
+
+@pytest.mark.parametrize('accept, encoding', [
+    pytest.param('gzip', 'gzip', id='gzip accepted'),
+    pytest.param('identity', None, id='gzip not accepted'),
+])
+def test_django_view_streamed(django_map, monkeypatch, accept, encoding):
+    """Test a sitemap is streamed while it is not rendered and then sent from cache."""
+    monkeypatch.setattr(django_map.config, 'STREAM', True)
+    monkeypatch.setattr(django_map, 'cache_period', timedelta(hours=1))
+    client = Client()
+    streamed = client.get('/sitemap.xml', HTTP_ACCEPT_ENCODING=accept)
+    data = b''.join(streamed.streaming_content)
+    cached = client.get('/sitemap.xml', HTTP_ACCEPT_ENCODING=accept)
+
+    body = gzip.decompress(data) if encoding else data
+    assert body.decode() == django_map.render()
+    assert streamed.get('Content-Encoding') == encoding
+    assert not streamed.has_header('ETag')
+    assert not cached.streaming
+    assert cached.content == data
+    assert cached.has_header('ETag')
+
+
+def test_django_view_streamed_build_error(django_map, monkeypatch):
+    """Test a failed build is raised before a response starts instead of truncating it."""
+    monkeypatch.setattr(django_map.config, 'STREAM', True)
+    monkeypatch.setattr(django_map, '_build_snapshot', Mock(side_effect=RuntimeError))
+
+    with pytest.raises(RuntimeError):
+        Client().get('/sitemap.xml')
+
+
+def test_django_view_published_file(django_map, monkeypatch, tmp_path):
+    """Test the published file is served."""
+    filename = str(tmp_path / 'sitemap.xml')
+    monkeypatch.setattr(django_map.config, 'SERVE_FILE', True)
+    monkeypatch.setattr(django_map.config, 'FILENAME', filename)
+    monkeypatch.setattr(django_map, 'cache_period', timedelta(hours=1))
+    client = Client()
+    response = client.get('/sitemap.xml')
+    data = b''.join(response.streaming_content)
+    cached = client.get('/sitemap.xml', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+
+    assert response.status_code == 200
+    assert response['Content-Type'] == 'application/xml'
+    assert data == open(filename, 'rb').read()
+    assert data.decode() == django_map.render()
+    assert cached.status_code == 304
+
+
+def test_django_view_published_file_not_opened(django_map, monkeypatch, tmp_path):
+    """Test the published file is not opened for a 304 response."""
+    monkeypatch.setattr(django_map.config, 'SERVE_FILE', True)
+    monkeypatch.setattr(django_map.config, 'FILENAME', str(tmp_path / 'sitemap.xml'))
+    monkeypatch.setattr(django_map, 'cache_period', timedelta(hours=1))
+    client = Client()
+    modified = client.get('/sitemap.xml')['Last-Modified']
+    opener = Mock(side_effect=open)
+    monkeypatch.setattr('dynamic_sitemap.contrib.django.open', opener, raising=False)
+    cached = client.get('/sitemap.xml', HTTP_IF_MODIFIED_SINCE=modified)
+
+    assert cached.status_code == 304
+    assert cached['Last-Modified'] == modified
+    opener.assert_not_called()
+
+
+def test_django_view_published_shards(posts, monkeypatch, tmp_path):
+    """Test shards of the published index are served next to the view."""
+    monkeypatch.setattr(DjangoSitemap.config, 'SERVE_FILE', True)
+    monkeypatch.setattr(DjangoSitemap.config, 'FILENAME', str(tmp_path / 'sitemap.xml'))
+    monkeypatch.setattr(DjangoSitemap.config, 'MAX_ITEMS', 2)
+    sitemap = DjangoSitemap(TEST_URL, ['/a', '/b'])
+    monkeypatch.setattr(sys.modules[__name__], 'urlpatterns', sitemap.urls)
+    clear_url_caches()
+
+    try:
+        index = Client().get('/sitemap.xml')
+        shard = Client().get('/sitemap-2.xml')
+        missing = Client().get('/sitemap-3.xml')
+    finally:
+        clear_url_caches()
+
+    assert f'<loc>{TEST_URL}/sitemap-2.xml</loc>' in b''.join(index.streaming_content).decode()
+    assert b''.join(shard.streaming_content) == (tmp_path / 'sitemap-2.xml').read_bytes()
+    assert missing.status_code == 404
+
+
+def test_django_metrics_view(posts, monkeypatch):
+    """Test statistics are served in Prometheus text format."""
+    monkeypatch.setattr(DjangoSitemap.config, 'METRICS_RULE', '/sitemap-metrics')
+    sitemap = DjangoSitemap(TEST_URL)
+    monkeypatch.setattr(sys.modules[__name__], 'urlpatterns', sitemap.urls)
+    clear_url_caches()
+
+    try:
+        Client().get('/sitemap.xml')
+        response = Client().get('/sitemap-metrics')
+    finally:
+        clear_url_caches()
+
+    assert response.status_code == 200
+    assert response['Content-Type'].startswith('text/plain')
+    assert b'sitemap_' in response.content
@@ -1,4 +1,7 @@
+import gzip
 import os
+from datetime import timedelta
+from unittest.mock import Mock
 from uuid import uuid4
 
 import pytest
@@ -77,3 +80,151 @@ def test_flask_view(flask_client, flask_map):
 
     assert response.status_code == 200
     assert response.content_type == 'application/xml'
+
+
+@pytest.mark.parametrize('accept, encoding', [
+    pytest.param('gzip, deflate', 'gzip', id='gzip accepted'),
+    pytest.param('identity', None, id='gzip not accepted'),
+])
+def test_flask_view_encoding(flask_client, flask_map, accept, encoding):
+    """Test the content encoding negotiation."""
+    with flask_client() as client:
+        response = client.get('/sitemap.xml', headers={'Accept-Encoding': accept})
+
+    body = gzip.decompress(response.data) if encoding else response.data
+    assert response.headers.get('Content-Encoding') == encoding
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert body.decode() == flask_map.render()
+
+
+def test_flask_view_compressed_cached(flask_client, flask_map, monkeypatch):
+    """Test compressed data is reused while the sitemap data is cached."""
+    monkeypatch.setattr(flask_map, '_should_use_cache', lambda: True)
+
+    with flask_client() as client:
+        first = client.get('/sitemap.xml', headers={'Accept-Encoding': 'gzip'})
+        monkeypatch.setattr(gzip, 'compress', None)
+        second = client.get('/sitemap.xml', headers={'Accept-Encoding': 'gzip'})
+
+    assert first.data == second.data
+
+
+def test_flask_view_conditional(flask_client, flask_map, monkeypatch):
+    """Test 304 responses and that repeated requests are served without rendering."""
+    monkeypatch.setattr(flask_map, '_should_use_cache', lambda: True)
+
+    with flask_client() as client:
+        response = client.get('/sitemap.xml')
+        etag, modified = response.headers['ETag'], response.headers['Last-Modified']
+        monkeypatch.setattr(flask_map, 'renderer_cls', None)
+
+        assert client.get('/sitemap.xml').data == response.data
+        assert client.get('/sitemap.xml', headers={'If-None-Match': etag}).status_code == 304
+        assert client.get('/sitemap.xml', headers={'If-Modified-Since': modified}).status_code == 304
+        assert client.get('/sitemap.xml', headers={'If-None-Match': '"other"'}).status_code == 200
+
+
+def test_flask_view_etag_unchanged(flask_client, flask_map):
+    """Test the ETag is kept if rebuilt data has not changed."""
+    with flask_client() as client:
+        first = client.get('/sitemap.xml')
+        second = client.get('/sitemap.xml')
+
+    assert first.headers['ETag'] == second.headers['ETag']
+    assert first.headers['Last-Modified'] == second.headers['Last-Modified']
+
+
+@pytest.mark.parametrize('accept, encoding', [
+    pytest.param('gzip', 'gzip', id='gzip accepted'),
+    pytest.param('identity', None, id='gzip not accepted'),
+])
+def test_flask_view_streamed(flask_client, flask_map, monkeypatch, accept, encoding):
+    """Test a sitemap is streamed while it is not rendered and then sent from cache."""
+    monkeypatch.setattr(flask_map.config, 'STREAM', True)
+    monkeypatch.setattr(flask_map, 'cache_period', timedelta(hours=1))
+
+    # contexts are not preserved, a response is sent when the request is over
+    client = flask_client()
+    streamed = client.get('/sitemap.xml', headers={'Accept-Encoding': accept})
+    is_streamed = streamed.is_streamed
+    data = streamed.data
+    cached = client.get('/sitemap.xml', headers={'Accept-Encoding': accept})
+
+    body = gzip.decompress(data) if encoding else data
+    assert body.decode() == flask_map.render()
+    assert is_streamed
+    assert streamed.headers.get('Content-Encoding') == encoding
+    assert 'ETag' not in streamed.headers
+    assert cached.data == data
+    assert cached.headers.get('Content-Encoding') == encoding
+    assert 'ETag' in cached.headers
+
+
+def test_flask_view_streamed_build_error(flask_client, flask_map, monkeypatch):
+    """Test a failed build is raised before a response starts instead of truncating it."""
+    monkeypatch.setattr(flask_map.config, 'STREAM', True)
+    monkeypatch.setattr(flask_map, '_build_snapshot', Mock(side_effect=RuntimeError))
+
+    with pytest.raises(RuntimeError):
+        flask_client().get('/sitemap.xml', headers={'Accept-Encoding': 'gzip'})
+
+
+def test_flask_view_published_file(flask_client, flask_map, monkeypatch, tmp_path):
+    """Test the published file is served."""
+    filename = str(tmp_path / 'sitemap.xml')
+    monkeypatch.setattr(flask_map.config, 'SERVE_FILE', True)
+    monkeypatch.setattr(flask_map.config, 'FILENAME', filename)
+    monkeypatch.setattr(flask_map, 'cache_period', timedelta(hours=1))
+
+    with flask_client() as client:
+        response = client.get('/sitemap.xml')
+        etag = response.headers['ETag']
+        cached = client.get('/sitemap.xml', headers={'If-None-Match': etag})
+
+    assert response.status_code == 200
+    assert response.content_type == 'application/xml'
+    assert response.data == open(filename, 'rb').read()
+    assert response.data.decode() == flask_map.render()
+    assert cached.status_code == 304
+
+
+def test_flask_view_published_shards(flask_app, monkeypatch, tmp_path):
+    """Test shards of the published index are served next to the view and the files are reused."""
+    filename = tmp_path / 'sitemap.xml'
+    monkeypatch.setattr(FlaskSitemap.config, 'SERVE_FILE', True)
+    monkeypatch.setattr(FlaskSitemap.config, 'FILENAME', str(filename))
+    monkeypatch.setattr(FlaskSitemap.config, 'MAX_ITEMS', 2)
+    sitemap = FlaskSitemap(flask_app, TEST_URL, ['/a', '/b'])
+    published = []
+    publish = sitemap.publish
+    monkeypatch.setattr(sitemap, 'publish', lambda name: published.append(name) or publish(name))
+
+    with flask_app.test_client() as client:
+        index = client.get('/sitemap.xml')
+        shards = [client.get(f'/sitemap-{number}.xml') for number in (1, 2)]
+        missing = client.get('/sitemap-3.xml')
+        client.get('/sitemap.xml')
+
+    assert f'<loc>{TEST_URL}/sitemap-2.xml</loc>' in index.data.decode()
+    assert [shard.status_code for shard in shards] == [200, 200]
+    assert shards[1].data == (tmp_path / 'sitemap-2.xml').read_bytes()
+    assert missing.status_code == 404
+    # the file is not expired without CACHE_PERIOD
+    assert published == [str(filename)]
+
+
+def test_flask_metrics_view(flask_app, monkeypatch):
+    """Test statistics are served in Prometheus text format."""
+    monkeypatch.setattr(FlaskSitemap.config, 'METRICS_RULE', '/sitemap-metrics')
+    sitemap = FlaskSitemap(flask_app, TEST_URL)
+    sitemap.build()
+
+    with flask_app.test_client() as client:
+        client.get('/sitemap.xml')
+        response = client.get('/sitemap-metrics')
+
+    assert response.status_code == 200
+    assert response.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+    # data is rebuilt on every request without CACHE_PERIOD
+    assert 'dynamic_sitemap_builds_total 2' in response.data.decode()
+    assert 'dynamic_sitemap_output_bytes{encoding="identity"}' in response.data.decode()
@@ -0,0 +1,33 @@
+import subprocess
+import sys
+
+import pytest
+
+import dynamic_sitemap
+
+
+def get_imported(statement: str) -> set:
+    """Get modules imported by a statement in a new interpreter."""
+    code = f'import sys; {statement}; print(*sys.modules)'
+    process = subprocess.run([sys.executable, '-c', code], stdout=subprocess.PIPE, universal_newlines=True, check=True)
+    return set(process.stdout.split())
+
+
+@pytest.mark.parametrize('statement, absent', [
+    pytest.param('import dynamic_sitemap', {'dynamic_sitemap.core', 'flask', 'pytz'}, id='Package'),
+    pytest.param('from dynamic_sitemap import SimpleSitemap', {'flask', 'pytz', 'urllib.request'}, id='Core'),
+    pytest.param('from dynamic_sitemap import ChangeFreq', {'dynamic_sitemap.core', 'pytz'}, id='Validators'),
+    pytest.param('from dynamic_sitemap import FlaskSitemap', {'pytz', 'sqlite3'}, id='Flask'),
+    pytest.param('from dynamic_sitemap import DjangoSitemap', {'django', 'flask', 'pytz'}, id='Django'),
+])
+def test_lazy_imports(statement, absent):
+    """Test frameworks and the time zone database are not imported until they are used."""
+    assert not get_imported(statement) & absent
+
+
+def test_lazy_attributes():
+    assert set(dynamic_sitemap.__all__) <= set(dir(dynamic_sitemap))
+    assert dynamic_sitemap.SimpleSitemap.__module__ == 'dynamic_sitemap.core'
+
+    with pytest.raises(AttributeError):
+        dynamic_sitemap.UnknownSitemap
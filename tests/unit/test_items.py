@@ -1,5 +1,8 @@
+import tracemalloc
+
 import pytest
 
+from dynamic_sitemap.exceptions import SitemapValidationError
 from dynamic_sitemap.items import SitemapIndexItem, SitemapItem
 
 
@@ -29,3 +32,49 @@ def test_sitemap_index_item():
 ])
 def test_items_equal(item, result):
     assert (SitemapItem('/loc') == item) is result
+
+
+def test_items_values_stored_on_instance():
+    """Test values are kept by items only and not leaked to descriptors."""
+    first = SitemapItem('/first', '2020-01-01', 'daily', 0.5)
+    second = SitemapItem('/second')
+    assert not hasattr(first, '__dict__')
+    assert (first.loc, first.lastmod, first.changefreq, first.priority) == ('/first', '2020-01-01', 'daily', 0.5)
+    assert (second.loc, second.lastmod, second.changefreq, second.priority) == ('/second', None, None, None)
+
+
+def test_items_memory_released():
+    """Test nothing is left in memory after items are deleted."""
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    items = [SitemapItem(f'/page/{i}', '2020-01-01', 'daily', 0.5) for i in range(5000)]
+    del items
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # urllib.parse keeps a bounded cache of parsed URLs
+    assert after - before < 64 * 1024
+
+
+def test_items_bulk():
+    """Test items created in bulk equal to ones created one by one."""
+    rows = [('/first', '2020-01-01'), ('/second', None)]
+    items = SitemapItem.bulk(rows, 'daily', 0.5)
+    assert [item.as_string() for item in items] == [SitemapItem(*row, 'daily', 0.5).as_string() for row in rows]
+
+
+@pytest.mark.parametrize('rows, changefreq, priority, check_lastmod', [
+    ([('/loc', None)], 'sometimes', None, True),
+    ([('/loc', None)], None, 2, True),
+    ([('/loc', None), ('', None)], None, None, True),
+    ([('/loc', None), (1, None)], None, None, True),
+    ([('/loc', '01.01.2020')], None, None, True),
+])
+def test_items_bulk_validation(rows, changefreq, priority, check_lastmod):
+    with pytest.raises(SitemapValidationError):
+        SitemapItem.bulk(rows, changefreq, priority, check_lastmod)
+
+
+def test_items_bulk_trusted_lastmod():
+    """Test lastmod is not validated when it's trusted."""
+    item, = SitemapItem.bulk([('/loc', 'formatted')], check_lastmod=False)
+    assert item.lastmod == 'formatted'
@@ -0,0 +1,176 @@
+import gzip
+import os
+from io import BytesIO
+from xml.etree import ElementTree
+
+import pytest
+
+from dynamic_sitemap.exceptions import SitemapValidationError
+from dynamic_sitemap.items import SitemapIndexItem, SitemapItem
+from dynamic_sitemap.locks import FileLock
+from dynamic_sitemap.renderers import (
+    ShardFile, SitemapIndexXMLRenderer, SitemapXMLRenderer,
+)
+from tests.utils import TEST_URL
+
+
+def _tree_bytes(renderer):
+    io = BytesIO()
+    renderer.get_tree().write(io, xml_declaration=True, encoding='UTF-8')
+    return io.getvalue()
+
+
+@pytest.mark.parametrize('items', [
+    pytest.param([], id='Empty'),
+    pytest.param([SitemapItem(TEST_URL + '/page')], id='Loc only'),
+    pytest.param([
+        SitemapItem(TEST_URL + '/b?x=1&y=<2>', '2020-01-01', 'daily', 0.5),
+        SitemapItem(TEST_URL + '/a/ü', '2020-01-01T01:01:01+03:00', priority=1.0),
+    ], id='Escaped and unicode'),
+])
+def test_xml_renderer_streaming_identical(items):
+    """Test the streamed output is the same as the element tree output."""
+    renderer = SitemapXMLRenderer(items)
+    assert b''.join(renderer.iter_bytes()) == _tree_bytes(renderer)
+    assert renderer.render() == _tree_bytes(renderer).decode()
+
+
+def test_xml_index_renderer_streaming_identical():
+    items = [SitemapIndexItem(TEST_URL + f'/sitemap-{i}.xml', '2020-01-01') for i in range(3)]
+    renderer = SitemapIndexXMLRenderer(items)
+    assert b''.join(renderer.iter_bytes()) == _tree_bytes(renderer)
+
+
+def test_xml_renderer_chunks(monkeypatch):
+    """Test the output is split into chunks."""
+    items = [SitemapItem(f'{TEST_URL}/page/{i}') for i in range(100)]
+    renderer = SitemapXMLRenderer(items)
+    monkeypatch.setattr(renderer, 'chunk_size', 256)
+    chunks = list(renderer.iter_bytes())
+    assert len(chunks) > 1
+    assert b''.join(chunks) == _tree_bytes(renderer)
+    assert len(ElementTree.fromstring(b''.join(chunks))) == 100
+
+
+def test_xml_renderer_stream():
+    """Test writing to a file-like object."""
+    renderer = SitemapXMLRenderer([SitemapItem(TEST_URL + '/page')])
+    io = BytesIO()
+    renderer.stream(io)
+    assert io.getvalue() == _tree_bytes(renderer)
+
+
+def test_xml_renderer_write_gzip(tmp_path):
+    """Test a file with '.gz' extension is compressed."""
+    renderer = SitemapXMLRenderer([SitemapItem(TEST_URL + '/page')])
+    filename = tmp_path / 'sitemap.xml.gz'
+    renderer.write(str(filename))
+    with gzip.open(str(filename)) as file:
+        assert file.read() == _tree_bytes(renderer)
+
+
+def test_xml_renderer_merges_streams():
+    """Test merged streams are rendered the same as sorted items keeping the first of duplicates."""
+    first = [SitemapItem(TEST_URL + path) for path in ('/a', '/c', '/e')]
+    second = [SitemapItem(TEST_URL + path, '2020-01-01') for path in ('/b', '/c', '/d')]
+    items = set(first) | set(second)
+    merged = SitemapXMLRenderer(items, streams=[first, second])
+
+    assert list(merged.get_ordered()) == sorted(items, key=lambda i: i.loc)
+    assert merged.render() == SitemapXMLRenderer(items).render()
+    assert [i.lastmod for i in merged.get_ordered()] == [None, '2020-01-01', None, '2020-01-01', None]
+
+
+@pytest.mark.parametrize('order, expected', [
+    ('none', ['/b', '/a', '/c']),
+    ('loc', ['/a', '/b', '/c']),
+    ('lastmod', ['/c', '/b', '/a']),
+])
+def test_xml_renderer_order(order, expected):
+    items = [
+        SitemapItem(TEST_URL + '/b', '2020-01-01'),
+        SitemapItem(TEST_URL + '/a', '2020-02-01'),
+        SitemapItem(TEST_URL + '/c'),
+    ]
+    renderer = SitemapXMLRenderer(items, order)
+    assert [item.loc for item in renderer.get_ordered()] == [TEST_URL + path for path in expected]
+
+
+def test_xml_renderer_bad_order():
+    with pytest.raises(SitemapValidationError):
+        SitemapXMLRenderer([], 'slug')
+
+
+def test_xml_renderer_write_atomic(tmp_path, monkeypatch):
+    """Test a failed writing keeps the previous file and leaves no temporary files."""
+    filename = tmp_path / 'sitemap.xml'
+    filename.write_bytes(b'previous')
+    renderer = SitemapXMLRenderer([SitemapItem(TEST_URL + '/page')])
+
+    def broken(*args):
+        yield b'partial'
+        raise OSError('No space left on device')
+
+    monkeypatch.setattr(renderer, 'iter_bytes', broken)
+    with pytest.raises(OSError):
+        renderer.write(str(filename))
+
+    assert filename.read_bytes() == b'previous'
+    assert os.listdir(tmp_path) == ['sitemap.xml']
+
+    monkeypatch.undo()
+    renderer.write(str(filename))
+    assert filename.read_bytes() == b''.join(renderer.iter_bytes())
+    assert os.listdir(tmp_path) == ['sitemap.xml']
+
+
+def test_xml_renderer_iter_shards(tmp_path):
+    """Test shards with the same content are not rewritten."""
+    items = [SitemapItem(f'{TEST_URL}/page{i}') for i in range(5)]
+    get_filename = (lambda number: str(tmp_path / f'sitemap-{number}.xml'))
+
+    shards = list(SitemapXMLRenderer(items).iter_shards(get_filename, 2, 1024))
+    assert [(shard.first, shard.last, shard.count) for shard in shards] == [
+        (f'{TEST_URL}/page0', f'{TEST_URL}/page1', 2),
+        (f'{TEST_URL}/page2', f'{TEST_URL}/page3', 2),
+        (f'{TEST_URL}/page4', f'{TEST_URL}/page4', 1),
+    ]
+    assert all(shard.changed for shard in shards)
+
+    items[3] = SitemapItem(f'{TEST_URL}/page3', '2020-01-01')
+    digests = {shard.filename: shard.digest for shard in shards}
+    rewritten = list(SitemapXMLRenderer(items).iter_shards(get_filename, 2, 1024, digests))
+    assert [shard.changed for shard in rewritten] == [False, True, False]
+    assert rewritten[0].digest == shards[0].digest
+    assert rewritten[1].digest != shards[1].digest
+    assert sorted(os.listdir(tmp_path)) == ['sitemap-1.xml', 'sitemap-2.xml', 'sitemap-3.xml']
+
+
+def test_shard_file_kept(tmp_path):
+    """Test the previous file with the same content stays untouched."""
+    filename = tmp_path / 'sitemap-1.xml'
+
+    with ShardFile(str(filename)) as file:
+        file.write(b'content')
+    assert file.changed
+
+    os.utime(filename, (0, 0))
+    with ShardFile(str(filename), file.digest) as same:
+        same.write(b'content')
+    assert not same.changed
+    assert os.path.getmtime(filename) == 0
+    assert os.listdir(tmp_path) == ['sitemap-1.xml']
+
+
+def test_file_lock(tmp_path):
+    """Test a file lock is acquired by one holder at a time."""
+    filename = str(tmp_path / 'sitemap.lock')
+    first, second = FileLock(filename), FileLock(filename)
+
+    with first:
+        assert first.locked
+        assert not second.acquire(blocking=False)
+
+    assert not first.locked
+    assert second.acquire(blocking=False)
+    second.release()
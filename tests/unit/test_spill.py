@@ -0,0 +1,100 @@
+import os
+
+import pytest
+
+from dynamic_sitemap.dedup import BloomFilter
+from dynamic_sitemap.exceptions import SitemapValidationError
+from dynamic_sitemap.items import SitemapItem
+from dynamic_sitemap.renderers import SitemapXMLRenderer
+from dynamic_sitemap.spill import ExternalSorter
+
+from ..utils import TEST_URL
+
+
+def get_items(*slugs, lastmod=None):
+    return [SitemapItem(f'{TEST_URL}/{slug}', lastmod) for slug in slugs]
+
+
+@pytest.mark.parametrize('max_items', [1, 2, 3, 100])
+def test_external_sorter(tmp_path, max_items):
+    """Test items are merged by location from runs of any size."""
+    with ExternalSorter(max_items, str(tmp_path)) as sorter:
+        sorter.add(get_items('e', 'b', 'd'))
+        sorter.add(get_items('a', 'c'))
+
+        assert [item.loc for item in sorter] == [f'{TEST_URL}/{slug}' for slug in 'abcde']
+        assert len(os.listdir(tmp_path)) == len(sorter.runs) == 5 // max_items
+        assert len(sorter) == 5
+
+    assert os.listdir(tmp_path) == []
+
+
+@pytest.mark.parametrize('max_items', [1, 2, 100])
+def test_external_sorter_unique(tmp_path, max_items):
+    """Test the first added item of a location is kept."""
+    with ExternalSorter(max_items, str(tmp_path)) as sorter:
+        sorter.add(get_items('b', 'a', lastmod='2020-01-01'))
+        sorter.add(get_items('a', 'b', 'c', lastmod='2021-01-01'))
+        items = list(sorter)
+        assert len(sorter) == 3
+
+    assert [(item.loc, item.lastmod) for item in items] == [
+        (f'{TEST_URL}/a', '2020-01-01'),
+        (f'{TEST_URL}/b', '2020-01-01'),
+        (f'{TEST_URL}/c', '2021-01-01'),
+    ]
+
+
+def test_external_sorter_renders(tmp_path):
+    """Test a sorter is rendered the same as items kept in memory."""
+    items = get_items(*(f'page{i}' for i in range(50)), lastmod='2020-01-01')
+
+    with ExternalSorter(7, str(tmp_path)) as sorter:
+        sorter.add(reversed(items))
+        assert SitemapXMLRenderer(sorter, 'none').render() == SitemapXMLRenderer(items).render()
+
+
+@pytest.mark.parametrize('max_items', [1, 2, 100])
+def test_external_sorter_by_lastmod(tmp_path, max_items):
+    """Test items are merged by the last modification and location, the first added item of a location is kept."""
+    with ExternalSorter(max_items, str(tmp_path), by_lastmod=True) as sorter:
+        sorter.add(get_items('c', 'a', lastmod='2021-01-01'))
+        sorter.add(get_items('b', 'c', lastmod='2020-01-01'))
+        sorter.add(get_items('d'))
+
+        assert len(sorter) == 4
+        assert [(item.loc, item.lastmod) for item in sorter] == [
+            (f'{TEST_URL}/d', None),
+            (f'{TEST_URL}/b', '2020-01-01'),
+            (f'{TEST_URL}/a', '2021-01-01'),
+            (f'{TEST_URL}/c', '2021-01-01'),
+        ]
+        # no set of locations is kept, unique items are sorted again in runs of max_items
+        assert sorter.seen is None
+        assert len(sorter.sorted_runs) == -(-4 // max_items)
+
+        sorter.add(get_items('e'))
+        assert not sorter.sorted_runs
+        assert len(sorter) == 5
+
+    assert os.listdir(tmp_path) == []
+
+
+def test_external_sorter_bloom_filter(tmp_path):
+    """Test items deduplicated by a Bloom filter keep the order they are added in."""
+    with ExternalSorter(2, str(tmp_path), BloomFilter(10, 0.001)) as sorter:
+        sorter.add(get_items('e', 'b', 'd', lastmod='2020-01-01'))
+        sorter.add(get_items('b', 'a', 'e', lastmod='2021-01-01'))
+
+        assert len(sorter.runs) == 2
+        assert len(sorter) == 4
+        assert [(item.loc, item.lastmod) for item in sorter] == [
+            (f'{TEST_URL}/{slug}', lastmod)
+            for slug, lastmod in zip('ebda', ['2020-01-01'] * 3 + ['2021-01-01'])
+        ]
+
+
+@pytest.mark.parametrize('max_items', [0, -1, 1.5, None])
+def test_external_sorter_bad_max_items(max_items):
+    with pytest.raises(SitemapValidationError):
+        ExternalSorter(max_items)
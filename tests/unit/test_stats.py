@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta
+
+from dynamic_sitemap.helpers import Model
+from dynamic_sitemap.stats import RuleStats, SitemapStats
+from tests.utils import TEST_URL, SitemapMock
+
+
+def get_sitemap():
+    sitemap = SitemapMock(TEST_URL)
+    sitemap.cache_period = timedelta(hours=1)
+    sitemap._rules = ['/rule/<slug>/']
+    sitemap.add_rule('/rule', Model(lambda: [(f'slug{i}', datetime(2020, 1, 1)) for i in range(5)]), loc_from='slug')
+    return sitemap
+
+
+def test_stats_build():
+    """Test statistics of a build and a render are recorded and callbacks are called."""
+    sitemap = get_sitemap()
+    events = []
+    sitemap.stats.add_callback(lambda event, stats: events.append((event, stats.builds)))
+    sitemap.build()
+    sitemap._get_rendered('gzip')
+
+    stats = sitemap.stats
+    rule = stats.rules['/rule/<slug>/']
+    assert stats.builds == 1
+    assert stats.items == 6
+    assert rule.rows == 5 and not rule.cached
+    assert rule.seconds >= rule.fetch_seconds + rule.sort_seconds
+    assert set(stats.phases) == {'rules', 'dedup', 'render', 'compress'}
+    assert stats.output_bytes['identity'] == len(sitemap._get_rendered().data)
+    assert stats.output_bytes['gzip'] == len(sitemap._get_rendered('gzip').data)
+    assert stats.cache_misses['data'] == 1
+    assert stats.cache_hits['data'] >= 1
+    assert events == [('build', 1), ('render', 1), ('render', 1)]
+
+
+def test_stats_callback_errors_ignored():
+    stats = SitemapStats()
+    stats.add_callback(lambda event, stats: 1 / 0)
+    stats.record_build({}, {'rules': 0.1}, 1)
+    assert stats.builds == 1
+
+
+def test_stats_prometheus():
+    stats = SitemapStats()
+    rule = RuleStats()
+    rule.rows, rule.seconds, rule.fetch_seconds = 10, 0.5, 0.25
+    stats.record_build({'/rule/<slug>/"\\': rule}, {'rules': 0.5, 'dedup': 0.1}, 11)
+    stats.record_cache('data', hit=True)
+    stats.record_cache('data', hit=False)
+    text = stats.to_prometheus()
+
+    assert text.endswith('\n')
+    assert '# TYPE dynamic_sitemap_builds_total counter' in text
+    assert 'dynamic_sitemap_builds_total 1\n' in text
+    assert 'dynamic_sitemap_items 11\n' in text
+    assert 'dynamic_sitemap_phase_seconds{phase="dedup"} 0.1\n' in text
+    assert 'dynamic_sitemap_rule_rows{rule="/rule/<slug>/\\"\\\\"} 10\n' in text
+    assert 'dynamic_sitemap_rule_seconds{rule="/rule/<slug>/\\"\\\\",phase="items"} 0.25\n' in text
+    assert 'dynamic_sitemap_cache_hits_total{cache="data"} 1\n' in text
+    assert 'dynamic_sitemap_cache_misses_total{cache="data"} 1\n' in text
@@ -121,3 +121,12 @@ def test_default_build_static(sitemap, fn1, fn2, error):
     sitemap.build()
     with pytest.raises(error):
         sitemap.write(fn2)
+
+
+@pytest.mark.parametrize('order', ['slug', 'LOC', 1])
+def test_config_order(config, order):
+    class Config:
+        ORDER = order
+
+    with pytest.raises(SitemapValidationError):
+        config.from_object(Config)
@@ -2,6 +2,7 @@ from datetime import datetime
 from unittest.mock import Mock
 
 from dynamic_sitemap.core import DynamicSitemapBase
+from dynamic_sitemap.helpers import Model
 
 
 PY_TYPES = int, float, complex, tuple, list, set, dict, str, bytes, bytearray
@@ -13,14 +14,31 @@ TEST_TIME = datetime.now()
 TEST_DATE_STR = TEST_TIME.strftime('%Y-%m-%dT')
 TEST_TIME_STR = TEST_TIME.strftime('%Y-%m-%dT%H:%M:%S')
 
+RECORDS = [
+    Mock(slug='first-slug', updated=TEST_TIME),
+    Mock(slug='second-slug', updated=TEST_TIME),
+]
+
+
+def get_values(*fields):
+    """Imitate ORM projections. Model attributes are field names here."""
+    return iter([tuple(getattr(record, field) for field in fields) for record in RECORDS])
+
+
 QUERYSET = Mock(
-    all=lambda: [
-        Mock(slug='first-slug', updated=TEST_TIME),
-        Mock(slug='second-slug', updated=TEST_TIME),
-    ],
+    all=lambda: RECORDS,
+    values_list=lambda *fields: Mock(iterator=lambda chunk_size: get_values(*fields)),
+    with_entities=lambda *fields: Mock(yield_per=lambda count: get_values(*fields)),
 )
 
-ORMModel = Mock(name='ORMModel', objects=QUERYSET, select=QUERYSET.all, query=QUERYSET)
+ORMModel = Mock(
+    name='ORMModel',
+    slug='slug',
+    updated='updated',
+    objects=QUERYSET,
+    select=lambda *fields: Mock(tuples=lambda: Mock(iterator=lambda: get_values(*fields))),
+    query=QUERYSET,
+)
 
 
 class SitemapMock(DynamicSitemapBase):
@@ -30,3 +48,15 @@ class SitemapMock(DynamicSitemapBase):
 
     def view(self):
         return 'response'
+
+
+def create_sitemap():
+    """A sitemap factory for the command line tests."""
+    sitemap = SitemapMock(TEST_URL, orm=None)
+    sitemap._rules = ['/rule/<slug>/']
+    sitemap.add_rule('/rule', Model(lambda: [(f'slug{i}', TEST_TIME) for i in range(10)]), loc_from='slug')
+    return sitemap
+
+
+class CLIConfig:
+    MAX_ITEMS = 4